@@ -1,13 +1,31 @@
 from __future__ import annotations
 
-import copy
 import hashlib
+import hmac
 import json
 import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import TypedDict
 
 from loguru import logger
 
+GAMES = ["go", "gomoku", "othello"]
+RECORD_FIELDS = [f"{game}_{field}" for game in GAMES for field in ("games_played", "wins")]
+SCHEMA_VERSION = 3
+# Leaderboard sort keys per game; each has an index on (key DESC, username), kept current by SQLite on every update
+RANKINGS = {"wins": "{game}_wins", "rate": "({game}_wins * 1.0 / {game}_games_played)"}
+
+# Password hashing for new and upgraded accounts; rows keep the parameters they were hashed with
+HASH_NAME = "sha256"
+ITERATIONS = 600000
+LEGACY_ITERATIONS = 100000  # accounts created before the parameters were stored
+SALT_BYTES = 32
+SESSION_TTL = 15 * 60  # seconds a successful login lets the same password skip the KDF
+
 
 class AccountInfo(TypedDict):
     password: str
@@ -20,84 +38,234 @@ class AccountInfo(TypedDict):
 
 
 class AccountManager:
-    def __init__(self, filename="accounts.json"):
+    # Accounts live in an SQLite database next to filename, one row per user keyed by name. Writes are single
+    # transactions and counters are incremented in SQL, so several GUI processes can share the file without
+    # overwriting each other's results. A JSON account file at filename is imported when the database is created.
+    def __init__(self, filename="accounts.json", iterations: int = ITERATIONS, hash_name: str = HASH_NAME):
         self.filename = filename
-        self.accounts = self.load_accounts()
-        self.login_state = {key: False for key, _ in self.accounts.items()}
+        self.db_path = os.path.splitext(filename)[0] + ".db"
+        self.iterations = iterations
+        self.hash_name = hash_name
+        # One connection per thread: logins run on the executor's threads, everything else on the caller's
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.connections_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="account")
+        # Sessions are kept in memory only: username -> (token, expiry). The token is keyed with a random
+        # per-process secret, so it is worthless outside this process and gone when it exits.
+        self.session_key = os.urandom(32)
+        self.sessions: dict[str, tuple[bytes, float]] = {}
+        # get_record() results by username, dropped by update_records(); the GUI reads them every frame
+        self.records: dict[str, dict] = {}
+        self.create_schema()
+        self.login_state: dict[str, bool] = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        db = getattr(self.local, "db", None)
+        if db is None:
+            # Autocommit mode: transaction() opens every write transaction itself
+            db = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            with self.connections_lock:
+                self.connections.append(db)
+        return db
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self.connections_lock:
+            for db in self.connections:
+                db.close()
+            self.connections = []
+        self.local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue on the busy timeout
+        # instead of failing when they try to upgrade a read lock
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
 
-    def load_accounts(self):
+    def create_schema(self):
+        if self.db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+        imported = 0
+        with self.transaction() as db:
+            # Checked again under the write lock: another process may have created the schema meanwhile
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version == SCHEMA_VERSION:
+                return
+            if version < 1:
+                columns = ", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in RECORD_FIELDS)
+                db.execute(f"CREATE TABLE IF NOT EXISTS accounts (username TEXT PRIMARY KEY, password TEXT NOT NULL, {columns})")
+                imported = self.import_accounts(db, self.load_accounts())
+            if version < 2:
+                # Version 2 records the hash parameters of every password
+                db.execute(f"ALTER TABLE accounts ADD COLUMN hash_name TEXT NOT NULL DEFAULT '{HASH_NAME}'")
+                db.execute(f"ALTER TABLE accounts ADD COLUMN iterations INTEGER NOT NULL DEFAULT {LEGACY_ITERATIONS}")
+            if version < 3:
+                # Version 3 adds the leaderboard indexes
+                for game in GAMES:
+                    for ranking, key in RANKINGS.items():
+                        db.execute(f"CREATE INDEX IF NOT EXISTS {game}_{ranking} ON accounts ({key.format(game=game)} DESC, username)")
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if imported:
+            logger.info(f"Imported {imported} accounts from {self.filename} into {self.db_path}")
+
+    def load_accounts(self) -> dict[str, AccountInfo]:
+        # The JSON account file of earlier versions, if there is one
         if not os.path.exists(self.filename):
             return {}
         with open(self.filename, "r") as file:
             return json.load(file)
 
-    def save_accounts(self):
-        with open(self.filename, "w") as file:
-            json.dump(self.accounts, file, indent=4)
+    def import_accounts(self, db: sqlite3.Connection, accounts: dict[str, AccountInfo]) -> int:
+        rows = [(username, info["password"], *(info.get(field, 0) for field in RECORD_FIELDS)) for username, info in accounts.items()]
+        placeholders = ", ".join("?" * (len(RECORD_FIELDS) + 2))
+        db.executemany(f"INSERT OR IGNORE INTO accounts (username, password, {', '.join(RECORD_FIELDS)}) VALUES ({placeholders})", rows)
+        return len(rows)
 
-    def _hash_password(self, password: str) -> str:
-        # Use a secure hashing algorithm with a salt
-        salt = os.urandom(32)  # A new salt for this user
-        hashed_password = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 100000)
+    def _hash_password(self, password: str, salt: bytes | None = None, hash_name: str | None = None, iterations: int | None = None) -> str:
+        # Use a secure hashing algorithm with a salt; a new salt and the current parameters unless given
+        salt = os.urandom(SALT_BYTES) if salt is None else salt
+        hashed_password = hashlib.pbkdf2_hmac(hash_name or self.hash_name, password.encode("utf-8"), salt, iterations or self.iterations)
         return (salt + hashed_password).hex()
 
-    def verify_password(self, username, password: str):
-        salt_from_storage = bytes.fromhex(self.accounts[username]["password"])[:32]  # The salt from the stored password
-        stored_password = bytes.fromhex(self.accounts[username]["password"])[32:]
-        hashed_password = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt_from_storage, 100000)
-        return hashed_password == stored_password
+    def stored_password(self, username: str) -> tuple[str, str, int] | None:
+        # Stored hash, hash name and iterations of the account
+        return self.db.execute("SELECT password, hash_name, iterations FROM accounts WHERE username = ?", (username,)).fetchone()
+
+    def verify_password(self, stored_row: tuple[str, str, int], password: str):
+        stored, hash_name, iterations = stored_row
+        salt_from_storage = bytes.fromhex(stored)[:SALT_BYTES]  # The salt from the stored password
+        return hmac.compare_digest(self._hash_password(password, salt_from_storage, hash_name, iterations), stored)
+
+    def session_token(self, username: str, password: str) -> bytes:
+        return hmac.new(self.session_key, f"{username}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def has_session(self, username: str, password: str) -> bool:
+        token, expiry = self.sessions.get(username, (b"", 0.0))
+        return time.time() < expiry and hmac.compare_digest(token, self.session_token(username, password))
+
+    def upgrade_password(self, username: str, password: str, stored: str):
+        # Rehashes a verified password with the current parameters, unless the row changed in the meantime
+        upgraded = self._hash_password(password)
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE accounts SET password = ?, hash_name = ?, iterations = ? WHERE username = ? AND password = ?",
+                (upgraded, self.hash_name, self.iterations, username, stored),
+            )
+        logger.info(f"Password hash of {username} upgraded to {self.hash_name} with {self.iterations} iterations")
 
     def register(self, username: str, password: str):
-        if username in self.accounts:
+        hashed_password = self._hash_password(password)  # hashed before taking the write lock
+        try:
+            with self.transaction() as db:
+                db.execute(
+                    "INSERT INTO accounts (username, password, hash_name, iterations) VALUES (?, ?, ?, ?)",
+                    (username, hashed_password, self.hash_name, self.iterations),
+                )
+        except sqlite3.IntegrityError:
             logger.warning("Username already exists")
             return False  # Username already exists
-        self.accounts[username] = AccountInfo(
-            password=self._hash_password(password),
-            go_games_played=0,
-            go_wins=0,
-            gomoku_games_played=0,
-            gomoku_wins=0,
-            othello_games_played=0,
-            othello_wins=0,
-        )
-        self.save_accounts()
         return True
 
     def login(self, username: str, password: str) -> bool:
-        if username not in self.accounts:
+        if self.has_session(username, password):
+            self.login_state[username] = True
+            logger.info("Login successful (session)")
+            return True
+        stored = self.stored_password(username)
+        if stored is None:
             logger.warning("Username does not exist, please register")
             return False  # Username does not exist
-        if not self.verify_password(username, password):
+        if not self.verify_password(stored, password):
             logger.warning("Incorrect password")
             return False
+        if stored[1:] != (self.hash_name, self.iterations):
+            self.upgrade_password(username, password, stored[0])
+        self.sessions[username] = (self.session_token(username, password), time.time() + SESSION_TTL)
         self.login_state[username] = True
         logger.info("Login successful")
         return True
 
+    def login_async(self, username: str, password: str) -> Future:
+        # login() on a worker thread, for callers that must keep drawing frames; the future holds its result
+        return self.executor.submit(self.login, username, password)
+
+    def register_async(self, username: str, password: str) -> Future:
+        return self.executor.submit(self.register, username, password)
+
+    def logout(self, username: str):
+        self.login_state.pop(username, None)
+        self.sessions.pop(username, None)
+        self.records.pop(username, None)
+
     def update_record(self, username: str, game: str, win: bool):
-        if username not in self.login_state:
-            return False
-        else:
-            if not self.login_state[username]:
-                return False
-        game_list = ["go", "gomoku", "othello"]
-        if game not in game_list:
-            return False
-        self.accounts[username][f"{game}_games_played"] += 1
-        if win:
-            self.accounts[username][f"{game}_wins"] += 1
-        self.save_accounts()
-        return True
+        return self.update_records([(username, game, win)]) == 1
+
+    def update_records(self, results: list[tuple[str, str, bool]]) -> int:
+        # Applies (username, game, win) results in one transaction and returns how many were recorded;
+        # results for users who are not logged in here or for unknown games are skipped
+        recorded = 0
+        with self.transaction() as db:
+            for username, game, win in results:
+                if not self.login_state.get(username, False) or game not in GAMES:
+                    continue
+                cursor = db.execute(
+                    f"UPDATE accounts SET {game}_games_played = {game}_games_played + 1, {game}_wins = {game}_wins + ? WHERE username = ?",
+                    (int(win), username),
+                )
+                recorded += cursor.rowcount
+        for username, _, _ in results:
+            self.records.pop(username, None)
+        return recorded
 
     def get_record(self, username: str) -> dict:
-        if username not in self.login_state:
+        # The same dict is returned until the user's record changes, so callers must not modify it
+        if not self.login_state.get(username, False):
             return {}
-        else:
-            if not self.login_state[username]:
+        if username not in self.records:
+            row = self.db.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM accounts WHERE username = ?", (username,)).fetchone()
+            if row is None:
                 return {}
-        record = copy.deepcopy(self.accounts[username])
-        del record["password"]
-        return record
+            self.records[username] = dict(zip(RECORD_FIELDS, row))
+        return self.records[username]
+
+    def ranking_key(self, game: str, by: str) -> str:
+        if game not in GAMES or by not in RANKINGS:
+            raise ValueError(f"No {by} ranking for {game}")
+        return RANKINGS[by].format(game=game)
+
+    def leaderboard(self, game: str, by: str = "wins", limit: int = 10, min_games: int = 1) -> list[tuple[str, int, int]]:
+        # (username, wins, games played) of the best players of a game, by wins or by win rate; read in index order
+        key = self.ranking_key(game, by)
+        return self.db.execute(
+            f"SELECT username, {game}_wins, {game}_games_played FROM accounts WHERE {game}_games_played >= ? ORDER BY {key} DESC, username LIMIT ?",
+            (min_games, limit),
+        ).fetchall()
+
+    def rank(self, username: str, game: str, by: str = "wins", min_games: int = 1) -> int | None:
+        # 1-based place of the user in leaderboard(game, by, min_games), or None if the user is not on it
+        key = self.ranking_key(game, by)
+        row = self.db.execute(f"SELECT {key}, {game}_games_played FROM accounts WHERE username = ?", (username,)).fetchone()
+        if row is None or row[1] < min_games:
+            return None
+        # Two index range counts: players ahead on the key, and players level on it but sorted before by name
+        ahead = self.db.execute(
+            f"SELECT (SELECT COUNT(*) FROM accounts WHERE {key} > ? AND {game}_games_played >= ?)"
+            f" + (SELECT COUNT(*) FROM accounts WHERE {key} = ? AND username < ? AND {game}_games_played >= ?)",
+            (row[0], min_games, row[0], username, min_games),
+        ).fetchone()[0]
+        return ahead + 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from loguru import logger
+
+from board import BaseBoardGame, Level1AIPlayerStrategy, PlayerStrategy
+
+
+class AIMoveRunner:
+    # Runs the AI to move on a worker thread against a snapshot of the game, so the frame loop keeps drawing while
+    # it thinks. A result is applied only if nothing happened to the game in the meantime: cancel() bumps the
+    # generation (undo, restart, load, new game or board size), and the round and position must still match.
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai")
+        self.generation = 0
+        self.pending: tuple[int, int, int, Future] | None = None  # generation, round, position key, future
+        self.failed: PlayerStrategy | None = None  # a strategy that raised, replaced by Level1 moves until cancel()
+
+    @property
+    def thinking(self) -> bool:
+        return self.pending is not None
+
+    def snapshot(self, game: BaseBoardGame) -> BaseBoardGame:
+        # A private copy for the strategy to search on; it never sees the game the GUI draws and edits. Copied rather
+        # than constructed, so settings such as komi carry over and constructors do not run (or log) every move.
+        position = copy.copy(game)
+        position.restore_from_memento(game.create_memento())
+        return position
+
+    def start(self, game: BaseBoardGame):
+        strategy = game.cur_player_strategy()
+        future = self.executor.submit(strategy.make_move, self.snapshot(game))
+        self.pending = (self.generation, game.round, game.position_key, future)
+
+    def cancel(self):
+        # The search itself cannot be interrupted; a started one runs to its time limit and its move is dropped
+        self.generation += 1
+        self.failed = None
+        if self.pending is not None:
+            self.pending[3].cancel()
+            self.pending = None
+
+    def update(self, game: BaseBoardGame) -> bool:
+        # Called every frame while an AI is to move: starts a search, or plays its move once it is ready.
+        # Returns whether a move was made.
+        if self.pending is None:
+            if game.cur_player_strategy() is self.failed:
+                # Rerunning a strategy that raised would most likely fail again, and log it, every frame
+                round = game.round
+                game.move(Level1AIPlayerStrategy(game.cur_player()).make_move(game))
+                return game.round != round
+            self.start(game)
+            return False
+        generation, round, position_key, future = self.pending
+        if not future.done():
+            return False
+        self.pending = None
+        if generation != self.generation or round != game.round or position_key != game.position_key:
+            return False  # the position changed while the AI was thinking; the next frame starts over
+        if future.exception() is not None:
+            logger.opt(exception=future.exception()).error("AI move failed, playing Level1 moves for it instead")
+            self.failed = game.cur_player_strategy()
+            return False
+        game.move(future.result())
+        return True
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import os
+import struct
+import time
+
+from loguru import logger
+
+import game_format
+
+# An archive is three append-only files next to each other:
+#   <path>.data    game_format records back to back
+#   <path>.index   a header, then one fixed-size entry per game; entry N describes game N
+#   <path>.names   player names as varint length + UTF-8, numbered in the order they were first seen
+# A game is committed once its index entry is written, so a crash mid-append leaves at most unreferenced data bytes.
+MAGIC = b"GIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")  # magic, version, entry size
+ENTRY = struct.Struct("<QIBBBBIII")  # data offset, length, game, board size, winner, flags, unix time, user1 id, user2 id
+SCAN_ENTRIES = 4096  # index entries read per chunk when scanning
+
+
+class ArchiveEntry:
+    __slots__ = ("id", "offset", "length", "name", "size", "winner", "game_over", "date", "user1", "user2")
+
+    def __init__(self, id: int, fields: tuple, names: list[str]):
+        offset, length, game, size, winner, flags, date, user1, user2 = fields
+        self.id = id
+        self.offset = offset
+        self.length = length
+        self.name = game_format.GAMES[game]
+        self.size = size
+        self.winner = game_format.WINNERS[winner]
+        self.game_over = bool(flags & game_format.GAME_OVER)
+        self.date = date
+        self.user1 = names[user1]
+        self.user2 = names[user2]
+
+
+class GameArchive:
+    def __init__(self, path: str):
+        self.path = path
+        for suffix in (".data", ".index", ".names"):
+            if not os.path.exists(path + suffix):
+                open(path + suffix, "ab").close()
+        self.data = open(path + ".data", "r+b")
+        self.index = open(path + ".index", "r+b")
+        self.names_file = open(path + ".names", "r+b")
+        if os.path.getsize(path + ".index") == 0:
+            self.index.write(HEADER.pack(MAGIC, VERSION, ENTRY.size))
+            self.index.flush()
+            self.index.seek(0)
+        header = self.index.read(HEADER.size)
+        if len(header) != HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, ENTRY.size):
+            self.close()
+            raise game_format.GameFormatError(f"{path} is not a version {VERSION} game archive")
+        # A torn entry at the end of the index is ignored and overwritten by the next append
+        self.count = (os.path.getsize(path + ".index") - HEADER.size) // ENTRY.size
+        self.names: list[str] = []
+        raw = self.names_file.read()
+        pos = 0
+        while pos < len(raw):
+            try:
+                name, next_pos = game_format.read_string(raw, pos)
+            except game_format.GameFormatError:
+                break
+            self.names.append(name)
+            pos = next_pos
+        self.names_end = pos
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        # In-memory lookups built from the index file for find(): game ids by player name id and by game type,
+        # and (unix time, game id) pairs sorted for range searches by date
+        self.by_player: dict[int, list[int]] = {}
+        self.by_game: dict[int, list[int]] = {}
+        self.by_date: list[tuple[int, int]] = []
+        for game_id, fields in self.index_fields():
+            self.add_lookups(game_id, fields)
+        self.by_date.sort()
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+        self.names_file.close()
+
+    def __enter__(self) -> GameArchive:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add_lookups(self, game_id: int, fields: tuple):
+        _, _, game, _, _, _, date, user1, user2 = fields
+        self.by_game.setdefault(game, []).append(game_id)
+        self.by_player.setdefault(user1, []).append(game_id)
+        if user2 != user1:
+            self.by_player.setdefault(user2, []).append(game_id)
+        self.by_date.append((date, game_id))
+
+    def name_id(self, name: str) -> int:
+        if name not in self.name_ids:
+            encoded = bytearray()
+            game_format.write_string(encoded, name)
+            self.names_file.seek(self.names_end)
+            self.names_file.write(encoded)
+            self.names_file.flush()
+            self.names_end += len(encoded)
+            self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return self.name_ids[name]
+
+    def append(self, record: game_format.GameRecord, date: int | None = None) -> int:
+        # Stores the game and returns its id
+        data = record.to_bytes()
+        self.data.seek(0, os.SEEK_END)
+        offset = self.data.tell()
+        self.data.write(data)
+        self.data.flush()
+        fields = (
+            offset,
+            len(data),
+            game_format.GAMES.index(record.name),
+            record.size,
+            game_format.WINNERS.index(record.winner),
+            game_format.GAME_OVER if record.game_over else 0,
+            int(time.time()) if date is None else date,
+            self.name_id(record.user1),
+            self.name_id(record.user2),
+        )
+        self.index.seek(HEADER.size + self.count * ENTRY.size)
+        self.index.write(ENTRY.pack(*fields))
+        self.index.flush()
+        game_id = self.count
+        self.count += 1
+        self.add_lookups(game_id, fields)
+        # Games usually arrive in date order, so by_date is rarely out of order after the append
+        if len(self.by_date) > 1 and self.by_date[-2] > self.by_date[-1]:
+            bisect.insort(self.by_date, self.by_date.pop())
+        return game_id
+
+    def entry(self, game_id: int) -> ArchiveEntry:
+        if not 0 <= game_id < self.count:
+            raise IndexError(f"game {game_id} is not in the archive")
+        self.index.seek(HEADER.size + game_id * ENTRY.size)
+        return ArchiveEntry(game_id, ENTRY.unpack(self.index.read(ENTRY.size)), self.names)
+
+    def __getitem__(self, game_id: int) -> game_format.GameRecord:
+        entry = self.entry(game_id)
+        self.data.seek(entry.offset)
+        return game_format.GameRecord.from_bytes(self.data.read(entry.length))
+
+    def index_fields(self, start: int = 0):
+        # (game id, raw entry fields) from start on, read in chunks
+        for chunk_start in range(start, self.count, SCAN_ENTRIES):
+            chunk_end = min(chunk_start + SCAN_ENTRIES, self.count)
+            self.index.seek(HEADER.size + chunk_start * ENTRY.size)
+            chunk = self.index.read((chunk_end - chunk_start) * ENTRY.size)
+            for i, fields in enumerate(ENTRY.iter_unpack(chunk)):
+                yield chunk_start + i, fields
+
+    def entries(self, start: int = 0):
+        # Index entries from start on
+        for game_id, fields in self.index_fields(start):
+            yield ArchiveEntry(game_id, fields, self.names)
+
+    def __iter__(self):
+        # Every game in id order; the data file is read front to back, one game in memory at a time
+        with open(self.path + ".data", "rb") as data:
+            for entry in self.entries():
+                if data.tell() != entry.offset:
+                    data.seek(entry.offset)
+                yield game_format.GameRecord.from_bytes(data.read(entry.length))
+
+    def find(
+        self,
+        name: str | None = None,
+        player: str | None = None,
+        winner: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ):
+        # Entries matching every given filter, in id order; since and until are unix times. The game type, player and
+        # date filters are answered from the in-memory lookups and intersected, so only matching entries are read.
+        matches: set[int] | None = None
+        if name is not None:
+            game = game_format.GAMES.index(name) if name in game_format.GAMES else -1
+            matches = set(self.by_game.get(game, ()))
+        if player is not None:
+            games = self.by_player.get(self.name_ids.get(player, -1), ())
+            matches = set(games) if matches is None else matches.intersection(games)
+        if since is not None or until is not None:
+            low = 0 if since is None else bisect.bisect_left(self.by_date, (since,))
+            high = len(self.by_date) if until is None else bisect.bisect_left(self.by_date, (until,))
+            games = (game_id for _, game_id in self.by_date[low:high])
+            matches = set(games) if matches is None else matches.intersection(games)
+        found = self.entries() if matches is None else (self.entry(game_id) for game_id in sorted(matches))
+        for entry in found:
+            if winner is not None and entry.winner != winner:
+                continue
+            yield entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add saved games to an archive or list what it holds")
+    parser.add_argument("archive")
+    parser.add_argument("games", nargs="*", help="game_format files to append")
+    parser.add_argument("--player", default=None)
+    args = parser.parse_args()
+
+    with GameArchive(args.archive) as archive:
+        for path in args.games:
+            archive.append(game_format.read(path), int(os.path.getmtime(path)))
+        if args.games:
+            logger.info(f"{len(args.games)} games added to {args.archive}")
+        for entry in archive.find(player=args.player):
+            winner = (entry.winner or "Tie") if entry.game_over else "Unfinished"
+            print(f"{entry.id}\t{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.date))}\t{entry.name}\t{entry.size}\t{entry.user1}\t{entry.user2}\t{winner}")
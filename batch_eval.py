@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import numpy as np
+
+import bitboard
+
+# Cell codes and the board conversion are re-exported so callers of this module need nothing from go_scoring
+from go_scoring import BLACK, EMPTY, WHITE, label_regions, to_array
+
+# Othello bitboard directions as unsigned shifts with their wrap masks
+SHIFTS = [(amount, np.uint64(mask)) for amount, mask in bitboard.DIRECTIONS]
+BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def stack(games) -> np.ndarray:
+    # (N, size, size) int8 stack of same-sized game positions
+    return np.stack([to_array(game.board) for game in games])
+
+
+def place_each(board: np.ndarray, moves: list[tuple[int, int]], color: int) -> np.ndarray:
+    # One copy of board per move with that move's stone added; captures and flips are not resolved
+    boards = np.repeat(board[np.newaxis], len(moves), axis=0)
+    if moves:
+        xs, ys = np.array(moves).T
+        boards[np.arange(len(moves)), xs, ys] = color
+    return boards
+
+
+def stone_counts(boards: np.ndarray) -> np.ndarray:
+    # (N, 2) black and white stone counts
+    return np.stack([(boards == BLACK).sum(axis=(1, 2)), (boards == WHITE).sum(axis=(1, 2))], axis=1)
+
+
+def line_windows(boards: np.ndarray, color: int) -> tuple[np.ndarray, np.ndarray]:
+    # Stones of color and of the opponent in every run of five points, for all four directions; one column per window
+    own = (boards == color).astype(np.int8)
+    opp = ((boards != color) & (boards != EMPTY)).astype(np.int8)
+    size = boards.shape[1]
+    own_sums = []
+    opp_sums = []
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        own_sum = 0
+        opp_sum = 0
+        for step in range(5):
+            x = slice(step * dx, size - 4 * dx + step * dx)
+            if dy == 1:
+                y = slice(step, size - 4 + step)
+            elif dy == -1:
+                y = slice(4 - step, size - step)
+            else:
+                y = slice(0, size)
+            own_sum = own_sum + own[:, x, y]
+            opp_sum = opp_sum + opp[:, x, y]
+        own_sums.append(own_sum.reshape(len(boards), -1))
+        opp_sums.append(opp_sum.reshape(len(boards), -1))
+    return np.concatenate(own_sums, axis=1), np.concatenate(opp_sums, axis=1)
+
+
+def line_counts(boards: np.ndarray, color: int) -> np.ndarray:
+    # (N, 6): number of five-point windows holding k = 0..5 stones of color and none of the opponent's
+    own, opp = line_windows(boards, color)
+    open_windows = opp == 0
+    return np.stack([((own == k) & open_windows).sum(axis=1) for k in range(6)], axis=1)
+
+
+def liberties(boards: np.ndarray) -> np.ndarray:
+    # Liberties of the string through every stone (0 on empty points), for a (N, size, size) stack
+    empty = boards == EMPTY
+    index = np.arange(boards.size).reshape(boards.shape)
+    result = np.zeros(boards.shape, dtype=np.int64)
+    for color in (BLACK, WHITE):
+        stones = boards == color
+        labels = label_regions(stones)
+        keys = []
+        for here, there in (
+            ((slice(None), slice(0, -1), slice(None)), (slice(None), slice(1, None), slice(None))),
+            ((slice(None), slice(1, None), slice(None)), (slice(None), slice(0, -1), slice(None))),
+            ((slice(None), slice(None), slice(0, -1)), (slice(None), slice(None), slice(1, None))),
+            ((slice(None), slice(None), slice(1, None)), (slice(None), slice(None), slice(0, -1))),
+        ):
+            # (string, empty point) pairs, deduplicated below so a liberty shared by two stones counts once
+            touching = stones[here] & empty[there]
+            keys.append(labels[here][touching] * boards.size + index[there][touching])
+        pairs = np.unique(np.concatenate(keys))
+        counts = np.bincount(pairs // boards.size, minlength=boards.size)
+        result[stones] = counts[labels[stones]]
+    return result
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    # np.bitwise_count needs numpy 2.0; older versions count the bytes of each uint64 through a table
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).astype(np.int64)
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    return BYTE_POPCOUNT[bits.view(np.uint8)].reshape(bits.shape + (8,)).sum(axis=-1)
+
+
+def shift(bits: np.ndarray, amount: int, mask: np.uint64) -> np.ndarray:
+    if amount > 0:
+        return np.left_shift(bits, np.uint64(amount)) & mask
+    return np.right_shift(bits, np.uint64(-amount)) & mask
+
+
+def othello_mobility(own: np.ndarray, opp: np.ndarray) -> np.ndarray:
+    # bitboard.legal_moves over uint64 arrays of positions
+    own = own.astype(np.uint64)
+    opp = opp.astype(np.uint64)
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for amount, mask in SHIFTS:
+        x = shift(own, amount, mask) & opp
+        for _ in range(5):
+            x |= shift(x, amount, mask) & opp
+        moves |= shift(x, amount, mask) & empty
+    return moves
+
+
+def othello_flip_counts(own: np.ndarray, opp: np.ndarray, squares: np.ndarray) -> np.ndarray:
+    # Number of discs flipped by playing squares[i] in position (own[i], opp[i])
+    own = own.astype(np.uint64)
+    opp = opp.astype(np.uint64)
+    move = np.left_shift(np.uint64(1), squares.astype(np.uint64))
+    flipped = np.zeros_like(own)
+    for amount, mask in SHIFTS:
+        line = np.zeros_like(own)
+        x = shift(move, amount, mask)
+        for _ in range(6):
+            running = (x & opp) != 0
+            line |= np.where(running, x, np.uint64(0))
+            x = np.where(running, shift(x, amount, mask), x)
+        flipped |= np.where((x & own) != 0, line, np.uint64(0))
+    return popcount(flipped)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+# 8x8 Othello bitboards: square (x, y) is bit x * 8 + y, so bit 0 is the top-left corner.
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_FIRST_COL = 0xFEFEFEFEFEFEFEFE
+NOT_LAST_COL = 0x7F7F7F7F7F7F7F7F
+
+# (shift, mask) pairs; a positive shift moves towards higher bits, the mask drops squares that wrapped around a row.
+DIRECTIONS = [
+    (1, NOT_FIRST_COL),  # (0, 1)
+    (-1, NOT_LAST_COL),  # (0, -1)
+    (8, FULL),  # (1, 0)
+    (-8, FULL),  # (-1, 0)
+    (9, NOT_FIRST_COL),  # (1, 1)
+    (7, NOT_LAST_COL),  # (1, -1)
+    (-7, NOT_FIRST_COL),  # (-1, 1)
+    (-9, NOT_LAST_COL),  # (-1, -1)
+]
+
+CORNERS = 0x8100000000000081
+
+
+def square(coord: tuple[int, int]) -> int:
+    return coord[0] * 8 + coord[1]
+
+
+def coord(sq: int) -> tuple[int, int]:
+    return sq >> 3, sq & 7
+
+
+def shift(bits: int, amount: int, mask: int) -> int:
+    if amount > 0:
+        return (bits << amount) & mask & FULL
+    return (bits >> -amount) & mask
+
+
+def legal_moves(own: int, opp: int) -> int:
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for amount, mask in DIRECTIONS:
+        # Flood along the direction over at most six opponent discs, then step onto an empty square.
+        x = shift(own, amount, mask) & opp
+        x |= shift(x, amount, mask) & opp
+        x |= shift(x, amount, mask) & opp
+        x |= shift(x, amount, mask) & opp
+        x |= shift(x, amount, mask) & opp
+        x |= shift(x, amount, mask) & opp
+        moves |= shift(x, amount, mask) & empty
+    return moves
+
+
+def flips(own: int, opp: int, sq: int) -> int:
+    move = 1 << sq
+    flipped = 0
+    for amount, mask in DIRECTIONS:
+        line = 0
+        x = shift(move, amount, mask)
+        while x & opp:
+            line |= x
+            x = shift(x, amount, mask)
+        if x & own:
+            flipped |= line
+    return flipped
+
+
+def squares(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def count(bits: int) -> int:
+    return bits.bit_count()
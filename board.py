@@ -4,7 +4,6 @@
 from __future__ import annotations
 
 import copy
-import pickle
 import random
 from abc import ABC, abstractmethod
 from collections import deque
@@ -12,6 +11,25 @@ from enum import Enum
 
 from loguru import logger
 
+import bitboard
+import game_format
+import patterns
+from go_mcts import GoMCTS
+from gomoku_threats import ThreatSearcher
+from opening_book import OpeningBook
+from othello_search import ENDGAME_EMPTIES, EndgameSolver, OthelloSearcher, SearchTimeout
+from parallel import ParallelSearch
+
+try:
+    import numpy as np
+
+    import batch_eval
+    import go_scoring
+except ImportError:  # numpy is optional; Go scoring falls back to flood fill and the AIs to per-move loops
+    np = None
+    batch_eval = None
+    go_scoring = None
+
 
 class Color(Enum):
     EMPTY = "EMPTY"
@@ -19,6 +37,23 @@ class Color(Enum):
     WHITE = "WHITE"
 
 
+# Board cells by game_format cell code
+CELL_COLORS = [Color.EMPTY, Color.BLACK, Color.WHITE]
+CELL_CODES = {color: code for code, color in enumerate(CELL_COLORS)}
+
+ZOBRIST_SEED = 20231124
+ZOBRIST_WHITE_TO_MOVE = random.Random(ZOBRIST_SEED).getrandbits(64)
+_zobrist_tables: dict[int, list[list[dict[Color, int]]]] = {}
+
+
+def zobrist_table(size: int) -> list[list[dict[Color, int]]]:
+    # One random 64-bit key per point and color; seeded so keys are stable across processes and runs
+    if size not in _zobrist_tables:
+        rng = random.Random(ZOBRIST_SEED + size)
+        _zobrist_tables[size] = [[{Color.BLACK: rng.getrandbits(64), Color.WHITE: rng.getrandbits(64)} for _ in range(size)] for _ in range(size)]
+    return _zobrist_tables[size]
+
+
 class BaseBoardGame(ABC):
     def __init__(self, size: int, player1_strategy: PlayerStrategy, player2_strategy: PlayerStrategy):
         self.name = ""
@@ -29,10 +64,24 @@ class BaseBoardGame(ABC):
         self.round = 0
         self.game_over = False
         self.winner = ""
-        self.history: list[Memento] = []  # Use a list of Mementos for the history
+        self.history: list[MoveDelta] = []  # Only what each move changed, undone in reverse by regret()
+        self.search_stack: list[MoveDelta] = []  # Moves made by push(), undone by pop()
+        self.saved_record: game_format.GameRecord | None = None  # Loaded file whose moves have not been decoded yet
         self.replay: list[tuple[int, int] | None] = []
         self.allow_none_move = False
 
+    @property
+    def replay(self) -> list[tuple[int, int] | None]:
+        if self._replay is None:
+            self._replay = self.saved_record.moves
+            self.saved_record = None
+        return self._replay
+
+    @replay.setter
+    def replay(self, moves: list[tuple[int, int] | None] | None):
+        # None leaves the moves of saved_record to be decoded on first use
+        self._replay = moves
+
     def cur_player(self) -> Color:
         return Color.BLACK if self.round % 2 == 0 else Color.WHITE
 
@@ -43,10 +92,46 @@ class BaseBoardGame(ABC):
     def move(self, coord: tuple[int, int] | None = None):
         raise NotImplementedError
 
+    @abstractmethod
+    def apply(self, coord: tuple[int, int] | None) -> MoveDelta | None:
+        # Plays coord for the side to move and returns what changed, or None if it is not allowed; no logging
+        raise NotImplementedError
+
+    def push(self, coord: tuple[int, int] | None) -> bool:
+        # Make a move in place for search code: no replay, history, memento or logging. Undo it with pop().
+        delta = self.apply(coord)
+        if delta is None:
+            return False
+        self.search_stack.append(delta)
+        return True
+
+    def pop(self):
+        self.undo(self.search_stack.pop())
+
     @abstractmethod
     def check_available_moves(self) -> list[tuple[int, int]]:
         raise NotImplementedError
 
+    @abstractmethod
+    def is_legal(self, coord: tuple[int, int]) -> bool:
+        raise NotImplementedError
+
+    def collect_empty_points(self) -> set[tuple[int, int]]:
+        return {(x, y) for x in range(self.size) for y in range(self.size) if self.board[x][y] == Color.EMPTY}
+
+    def rehash(self):
+        self.zobrist = zobrist_table(self.size)
+        self.board_hash = 0
+        for x in range(self.size):
+            for y in range(self.size):
+                if self.board[x][y] != Color.EMPTY:
+                    self.board_hash ^= self.zobrist[x][y][self.board[x][y]]
+
+    @property
+    def position_key(self) -> int:
+        # Zobrist key of the stones plus the side to move, for caches and search code
+        return self.board_hash ^ ZOBRIST_WHITE_TO_MOVE if self.cur_player() == Color.WHITE else self.board_hash
+
     def cur_player_strategy(self) -> PlayerStrategy:
         return self.player1_strategy if self.cur_player() == Color.BLACK else self.player2_strategy
 
@@ -61,11 +146,24 @@ class BaseBoardGame(ABC):
 
     def regret(self):
         if len(self.history) > 0:
-            self.restore_from_memento(self.history.pop())
+            self.undo(self.history.pop())
+            self.replay.pop()
             logger.info("Move undone.")
         else:
             self.restart()
 
+    def undo_state(self) -> dict:
+        # Scalar fields a move may change; subclasses add their own
+        return {"round": self.round, "game_over": self.game_over, "winner": self.winner}
+
+    def restore_undo_state(self, state: dict):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    @abstractmethod
+    def undo(self, delta: MoveDelta):
+        raise NotImplementedError
+
     def restart(self):
         self.__init__(self.size, self.player1_strategy, self.player2_strategy)
 
@@ -77,13 +175,36 @@ class BaseBoardGame(ABC):
     def restore_from_memento(self, memento: Memento):
         raise NotImplementedError
 
-    @abstractmethod
+    def to_record(self, user1: str, user2: str) -> game_format.GameRecord:
+        cells = [[CELL_CODES[color] for color in row] for row in self.board]
+        return game_format.GameRecord(self.name, self.size, cells, self.round, self.game_over, self.winner, user1, user2, moves=self.replay)
+
+    def state_from_record(self, record: game_format.GameRecord) -> dict:
+        # Memento state for a loaded record; the replay is left to be decoded lazily
+        return {
+            "name": record.name,
+            "size": record.size,
+            "board": [[CELL_COLORS[code] for code in row] for row in record.cells],
+            "round": record.round,
+            "game_over": record.game_over,
+            "winner": record.winner,
+            "replay": None,
+        }
+
     def save_to_file(self, file_path: str, user1: str, user2: str):
-        raise NotImplementedError
+        game_format.write(file_path, self.to_record(user1, user2))
+        logger.info("Game saved to file.")
 
-    @abstractmethod
     def load_from_file(self, file_path: str, user1: str, user2: str):
-        raise NotImplementedError
+        record = game_format.read(file_path)
+        if record.name != self.name:
+            logger.warning(f"The game file holds a {record.name}, not a {self.name}.")
+        elif record.user1 != user1 or record.user2 != user2:
+            logger.warning("The game file does not match the current user.")
+        else:
+            self.restore_from_memento(Memento(self.state_from_record(record)))
+            self.saved_record = record
+            logger.info("Game loaded from file.")
 
 
 class Memento:
@@ -94,6 +215,26 @@ class Memento:
         return self.__state
 
 
+class MoveDelta:
+    __slots__ = ("coord", "changed", "state")
+
+    def __init__(self, coord: tuple[int, int] | None, changed: list[tuple[tuple[int, int], Color]], state: dict):
+        self.coord = coord  # the placed stone, None for a pass
+        self.changed = changed  # other points the move recolored, with their previous color
+        self.state = state  # undo_state() from before the move
+
+
+class GoString:
+    def __init__(self, color: Color, stones: set[tuple[int, int]], liberties: set[tuple[int, int]]):
+        self.color = color
+        self.stones = stones
+        self.liberties = liberties
+
+
+# A stone is dead when its point's ownership leans this far to the opponent, i.e. 60% of playouts against 40%
+DEAD_STONE_MARGIN = 0.2
+
+
 class GoGame(BaseBoardGame):
     # Rule 1: Go is played on a 19x19 square grid of points, by two players called Black and White.
     def __init__(self, size: int, player1_strategy: PlayerStrategy, player2_strategy: PlayerStrategy):
@@ -106,60 +247,139 @@ class GoGame(BaseBoardGame):
         self.abstention = 0
         self.final_score = ""
         self.allow_none_move = True
+        self.dead_stone_playouts = 64  # playouts for the ownership estimate at the end of the game, 0 to skip it
+        self.dead_stones: set[tuple[int, int]] = set()
+        self.adjacent = [[self.compute_neighbors((x, y)) for y in range(size)] for x in range(size)]
+        # Every stone points at the GoString it belongs to; strings are merged and removed incrementally
+        self.strings: list[list[GoString | None]] = [[None for _ in range(size)] for _ in range(size)]
+        self.zobrist = zobrist_table(size)
+        self.board_hash = 0
+        self.position_history: set[int] = {self.board_hash}
+        self.empty_points = self.collect_empty_points()
 
     def move(self, coord: tuple[int, int] | None = None):
-        if coord is not None:
-            if coord not in self.check_available_moves():
-                return
-        if self.game_over:
+        delta = self.apply(coord)
+        if delta is None:
+            if coord in self.empty_points and not self.game_over:
+                logger.info("Move repeats an earlier position (superko).")
             return
+        self.history.append(delta)
+        self.replay.append(coord)
+        if self.game_over:
+            if coord is None:
+                # Only a game that is actually played to the end pays for the dead stone playouts
+                self.remove_dead_stones()
+                self.set_result()
+            logger.info(f"Game over. {self.final_score}")
+
+    def apply(self, coord: tuple[int, int] | None) -> MoveDelta | None:
+        if self.game_over:
+            return None
+        state = self.undo_state()
         if coord is not None:
+            if coord not in self.empty_points:
+                return None
             # Rule 6: A turn is either a pass or a move that doesn’t repeat an earlier grid coloring (superko).
-            if self.ko_point == coord:
-                logger.info("Cannot recapture ko immediately.")
-                return
-
-            self.history.append(self.create_memento())
-            self.replay.append(coord)
+            if self.hash_after(coord, self.cur_player()) in self.position_history:
+                return None
 
             # Rule 5: Starting with an empty grid, the players alternate turns, starting with Black.
             current_color = self.cur_player()
             opposite_color = self.opposite_player()
-            x, y = coord
             # Rule 7: A move consists of coloring an empty point one’s own color; then clearing the opponent color, and then clearing one’s own color.
-            self.board[x][y] = current_color
-            opponent = [nbr for nbr in self.neighbors(coord) if self.board[nbr[0]][nbr[1]] == opposite_color]
-            captured = self.clear(opponent)
+            captured, self_captured = self.place_stone(coord, current_color)
+            self.position_history.add(self.board_hash)
+            self.abstention = 0
+            changed = [(point, opposite_color) for point in captured] + [(point, current_color) for point in self_captured if point != coord]
 
             # set ko point
             if len(captured) == 1:
-                self.ko_point = captured.pop()
+                self.ko_point = next(iter(captured))
             else:
                 self.ko_point = None
-
-            self.clear(coord)
         else:  # pass
-            self.history.append(self.create_memento())
-            self.replay.append(None)
+            changed = []
             self.abstention += 1
             # Rule 8: The game ends after two consecutive passes.
             if self.abstention == 2:
-                # Rule 10: The player with the higher score at the end of the game is the winner. Equal scores result in a tie.
-                black_score, white_score = self.score()
-                logger.info(f"Game over. Black: {black_score}, White: {white_score}")
+                # Scored with every stone alive, so search and replay copies get the same result every time;
+                # move() then rescores it with the dead stones taken off
                 self.game_over = True
-                self.winner = f"Black" if black_score > white_score else f"White" if black_score < white_score else f"Tie"
-                self.final_score = f"Black: {black_score}, White: {white_score}"
+                self.dead_stones = set()
+                self.set_result()
 
         self.round += 1
+        return MoveDelta(coord, changed, state)
 
     def check_available_moves(self) -> list[tuple[int, int] | None]:
-        available_moves = []
-        for x in range(self.size):
-            for y in range(self.size):
-                if self.board[x][y] == Color.EMPTY and (x, y) != self.ko_point:
-                    available_moves.append((x, y))
-        return available_moves
+        # Every move move() accepts: superko rules out suicides, ko recaptures and longer cycles alike.
+        # hash_after only looks at the neighbouring strings, so this stays cheap on a full board.
+        return [coord for coord in self.empty_points if self.is_legal(coord)]
+
+    def undo_state(self) -> dict:
+        state = super().undo_state()
+        state.update(
+            final_score=self.final_score,
+            ko_point=self.ko_point,
+            last_move_captured=self.last_move_captured,
+            abstention=self.abstention,
+            board_hash=self.board_hash,
+            dead_stones=self.dead_stones,
+        )
+        return state
+
+    def undo(self, delta: MoveDelta):
+        if delta.coord is not None:
+            # The position after this move is unique under superko, so it can be dropped from the history
+            self.position_history.discard(self.board_hash)
+            x, y = delta.coord
+            self.board[x][y] = Color.EMPTY
+            self.empty_points.add(delta.coord)
+            points = {delta.coord}
+            for (cx, cy), color in delta.changed:
+                self.board[cx][cy] = color
+                self.empty_points.discard((cx, cy))
+                points.add((cx, cy))
+            for point in list(points):
+                points.update(self.adjacent[point[0]][point[1]])
+            self.rebuild_strings(list(points))
+        self.restore_undo_state(delta.state)
+
+    def is_legal(self, coord: tuple[int, int]) -> bool:
+        return coord in self.empty_points and self.hash_after(coord, self.cur_player()) not in self.position_history
+
+    def hash_after(self, coord: tuple[int, int], color: Color) -> int:
+        # Board hash after playing coord, worked out from the neighbouring strings without touching the board
+        x, y = coord
+        board_hash = self.board_hash ^ self.zobrist[x][y][color]
+        friends = []
+        has_liberty = False
+        seen = []
+        for nx, ny in self.adjacent[x][y]:
+            nbr_string = self.strings[nx][ny]
+            if nbr_string is None:
+                has_liberty = True
+            elif nbr_string in seen:
+                continue
+            else:
+                seen.append(nbr_string)
+                if nbr_string.color == color:
+                    friends.append(nbr_string)
+                elif len(nbr_string.liberties) == 1:
+                    board_hash ^= self.string_hash(nbr_string)
+                    has_liberty = True
+        if not has_liberty and all(len(friend.liberties) == 1 for friend in friends):
+            # Suicide: the new stone and every string it joins are cleared
+            board_hash ^= self.zobrist[x][y][color]
+            for friend in friends:
+                board_hash ^= self.string_hash(friend)
+        return board_hash
+
+    def string_hash(self, go_string: GoString) -> int:
+        string_hash = 0
+        for x, y in go_string.stones:
+            string_hash ^= self.zobrist[x][y][go_string.color]
+        return string_hash
 
     def create_memento(self) -> Memento:
         # Save the current state in a memento
@@ -172,11 +392,12 @@ class GoGame(BaseBoardGame):
             "winner": self.winner,
             "final_score": self.final_score,
             # "history": copy.deepcopy(self.history),
-            "replay": copy.deepcopy(self.replay),
+            "replay": list(self.replay),
             "komi": self.komi,
             "ko_point": self.ko_point,
             "last_move_captured": self.last_move_captured,
             "abstention": self.abstention,
+            "position_history": set(self.position_history),
         }
         return Memento(state)
 
@@ -192,60 +413,165 @@ class GoGame(BaseBoardGame):
         self.final_score = state["final_score"]
         # self.history = state["history"]
         self.replay = state["replay"]
+        self.history = []
+        self.search_stack = []
         self.komi = state["komi"]
         self.ko_point = state["ko_point"]
         self.last_move_captured = state["last_move_captured"]
         self.abstention = state["abstention"]
-
-    def save_to_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "wb") as file:
-            pickle.dump((self.create_memento(), {"user1": user1, "user2": user2}), file)
-            logger.info("Game saved to file.")
-
-    def load_from_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "rb") as file:
-            memento, account_info = pickle.load(file)
-            if account_info["user1"] != user1 or account_info["user2"] != user2:
-                logger.warning("The game file does not match the current user.")
-            else:
-                self.restore_from_memento(memento)
-                logger.info("Game loaded from file.")
+        self.position_history = state["position_history"]
+        self.empty_points = self.collect_empty_points()
+        self.rebuild_strings()
+        self.rehash()
+
+    @property
+    def position_history(self) -> set[int]:
+        if self._position_history is None:
+            self._position_history = self.replayed_positions()
+        return self._position_history
+
+    @position_history.setter
+    def position_history(self, hashes: set[int] | None):
+        # None rebuilds the superko history from the replay when it is first needed
+        self._position_history = hashes
+
+    def replayed_positions(self) -> set[int]:
+        # Board hashes reached by the moves in the replay, played out on a scratch board
+        scratch = GoGame(self.size, None, None)
+        for move in self.replay:
+            scratch.apply(move)
+        return scratch.position_history | {self.board_hash}
+
+    def to_record(self, user1: str, user2: str) -> game_format.GameRecord:
+        record = super().to_record(user1, user2)
+        record.komi = self.komi
+        record.ko_point = self.ko_point
+        record.abstention = self.abstention
+        record.final_score = self.final_score
+        return record
+
+    def state_from_record(self, record: game_format.GameRecord) -> dict:
+        state = super().state_from_record(record)
+        state.update(
+            komi=record.komi,
+            ko_point=record.ko_point,
+            last_move_captured=None,
+            abstention=record.abstention,
+            final_score=record.final_score,
+            position_history=None,
+        )
+        return state
+
+    def compute_neighbors(self, coord: tuple[int, int]) -> list[tuple[int, int]]:
+        x, y = coord
+        return [(x, ny) for ny in (y - 1, y + 1) if 0 <= ny < self.size] + [(nx, y) for nx in (x - 1, x + 1) if 0 <= nx < self.size]
 
     def neighbors(self, coord: tuple[int, int]) -> list[tuple[int, int]]:
+        return self.adjacent[coord[0]][coord[1]]
+
+    def place_stone(self, coord: tuple[int, int], color: Color) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
         x, y = coord
-        return [(x, ny) for ny in (y - 1, y + 1) if 0 <= ny < self.size] + [(nx, y) for nx in (x - 1, x + 1) if 0 <= nx < self.size]
+        self.board[x][y] = color
+        self.board_hash ^= self.zobrist[x][y][color]
+        self.empty_points.discard(coord)
+        target = GoString(color, {coord}, set())
+        friends = []
+        enemies = []
+        for nx, ny in self.adjacent[x][y]:
+            nbr_string = self.strings[nx][ny]
+            if nbr_string is None:
+                target.liberties.add((nx, ny))
+            elif nbr_string.color == color:
+                if nbr_string not in friends:
+                    friends.append(nbr_string)
+            elif nbr_string not in enemies:
+                enemies.append(nbr_string)
+
+        # Merge the smaller strings into the largest one so each stone is re-pointed O(log n) times overall
+        for friend in friends:
+            if len(friend.stones) > len(target.stones):
+                target, friend = friend, target
+            target.stones |= friend.stones
+            target.liberties |= friend.liberties
+            for sx, sy in friend.stones:
+                self.strings[sx][sy] = target
+        self.strings[x][y] = target
+        target.liberties.discard(coord)
+
+        captured = set()
+        for enemy in enemies:
+            enemy.liberties.discard(coord)
+            if not enemy.liberties:
+                captured |= self.remove_string(enemy)
+
+        self_captured = set()
+        if not target.liberties:
+            self_captured = self.remove_string(target)
+        return captured, self_captured
 
     # Rule 4: Clearing a color is the process of emptying all points of that color that don’t reach empty.
     def clear(self, points: tuple[int, int] | list[tuple[int, int]]) -> set[tuple[int, int]]:
         if isinstance(points, tuple):
             points = [points]
         captured = set()
-        for pt in points:
-            str_points = self.string(pt)
-            if not self.liberties(str_points):
-                captured.update(str_points)
-        for cap in captured:
-            self.board[cap[0]][cap[1]] = Color.EMPTY
+        for x, y in points:
+            go_string = self.strings[x][y]
+            if go_string is not None and not go_string.liberties:
+                captured |= self.remove_string(go_string)
         return captured
 
-    # Rule 3: A point P, not colored C, is said to reach C if there is a path of (vertically or horizontally) adjacent points of P’s color from P to a point of color C.
-    def string(self, coord: tuple[int, int]) -> list[tuple[int, int]]:
-        visited = set()
-        visited.add(coord)
-
-        queue = deque([coord])
+    def remove_string(self, go_string: GoString) -> set[tuple[int, int]]:
+        for x, y in go_string.stones:
+            self.board[x][y] = Color.EMPTY
+            self.strings[x][y] = None
+            self.board_hash ^= self.zobrist[x][y][go_string.color]
+        self.empty_points |= go_string.stones
+        for stone in go_string.stones:
+            for nx, ny in self.adjacent[stone[0]][stone[1]]:
+                nbr_string = self.strings[nx][ny]
+                if nbr_string is not None:
+                    nbr_string.liberties.add(stone)
+        return go_string.stones
+
+    def rebuild_strings(self, points: list[tuple[int, int]] | None = None):
+        # Recompute the strings through the given points from self.board; the caller must pass every point whose
+        # string or liberties may have changed. Without points the whole board is rebuilt.
+        if points is None:
+            points = [(x, y) for x in range(self.size) for y in range(self.size)]
+            self.adjacent = [[self.compute_neighbors((x, y)) for y in range(self.size)] for x in range(self.size)]
+            self.strings = [[None for _ in range(self.size)] for _ in range(self.size)]
+        for x, y in points:
+            self.strings[x][y] = None
+        for x, y in points:
+            if self.board[x][y] == Color.EMPTY or self.strings[x][y] is not None:
+                continue
+            go_string = GoString(self.board[x][y], set(), set())
+            queue = deque([(x, y)])
+            go_string.stones.add((x, y))
+            while queue:
+                cx, cy = queue.popleft()
+                self.strings[cx][cy] = go_string
+                for nx, ny in self.adjacent[cx][cy]:
+                    if self.board[nx][ny] == Color.EMPTY:
+                        go_string.liberties.add((nx, ny))
+                    elif self.board[nx][ny] == go_string.color and (nx, ny) not in go_string.stones:
+                        go_string.stones.add((nx, ny))
+                        queue.append((nx, ny))
 
-        while queue:
-            for nbr in self.neighbors(queue.popleft()):
-                if self.board[nbr[0]][nbr[1]] == self.board[coord[0]][coord[1]] and nbr not in visited:
-                    visited.add(nbr)
-                    queue.append(nbr)
+    # Rule 3: A point P, not colored C, is said to reach C if there is a path of (vertically or horizontally) adjacent points of P’s color from P to a point of color C.
+    def string(self, coord: tuple[int, int]) -> set[tuple[int, int]]:
+        go_string = self.strings[coord[0]][coord[1]]
+        return set() if go_string is None else go_string.stones
 
-        return visited
+    def string_liberties(self, coord: tuple[int, int]) -> set[tuple[int, int]]:
+        go_string = self.strings[coord[0]][coord[1]]
+        return set() if go_string is None else go_string.liberties
 
     def liberties(self, group: list[tuple[int, int]]) -> bool:
-        empty = [nbr for p in group for nbr in self.neighbors(p) if self.board[nbr[0]][nbr[1]] == Color.EMPTY]
-        return len(empty) > 0
+        return any(self.board[nx][ny] == Color.EMPTY for x, y in group for nx, ny in self.adjacent[x][y])
+
+    def in_atari(self, coord: tuple[int, int]) -> bool:
+        return len(self.string_liberties(coord)) == 1
 
     def calculate_territory(self) -> tuple(set[tuple[int, int]], set[tuple[int, int]]):
         black_territory = set()
@@ -272,7 +598,22 @@ class GoGame(BaseBoardGame):
         return black_territory, white_territory
 
     def remove_dead_stones(self) -> tuple[int, int]:
-        return 0, 0
+        # Marks stones whose point the opponent owns in most playouts as dead, without taking them off the board,
+        # and returns how many black and white stones died. Needs numpy; without it every stone counts as alive.
+        self.dead_stones = set()
+        if go_scoring is None or self.dead_stone_playouts <= 0:
+            return 0, 0
+        owner = go_scoring.ownership(self, self.dead_stone_playouts)
+        black_dead = white_dead = 0
+        for x in range(self.size):
+            for y in range(self.size):
+                if self.board[x][y] == Color.BLACK and owner[x, y] < -DEAD_STONE_MARGIN:
+                    self.dead_stones.add((x, y))
+                    black_dead += 1
+                elif self.board[x][y] == Color.WHITE and owner[x, y] > DEAD_STONE_MARGIN:
+                    self.dead_stones.add((x, y))
+                    white_dead += 1
+        return black_dead, white_dead
 
     def flood_fill(self, start: tuple[int, int]):
         queue = deque([start])
@@ -293,15 +634,38 @@ class GoGame(BaseBoardGame):
 
         return territory, borders
 
-    def score(self):
+    # Rule 10: The player with the higher score at the end of the game is the winner. Equal scores result in a tie.
+    def set_result(self):
+        black_score, white_score = self.score()
+        self.winner = f"Black" if black_score > white_score else f"White" if black_score < white_score else f"Tie"
+        self.final_score = f"Black: {black_score}, White: {white_score}"
+
+    def score(self, area: bool = True):
         if self.round <= 2:
             return 0, self.komi
         # Rule 9: A player’s score is the number of points of her color, plus the number of empty points that reach only her color.
-        black_captures, white_captures = self.remove_dead_stones()
-        black_territory, white_territory = self.calculate_territory()
-
-        black_score = len(black_territory) + white_captures
-        white_score = len(white_territory) + black_captures + self.komi
+        # This area count is what the game is decided by and what the MCTS playouts score; area=False counts the empty
+        # points only, with dead stones as prisoners.
+        # The stones in dead_stones, as marked by remove_dead_stones(), are scored as taken off the board.
+        if go_scoring is not None:
+            # Dead stones are scored as empty points, so their area goes to the side that killed them
+            board = go_scoring.to_array(self.board)
+            for x, y in self.dead_stones:
+                board[x, y] = go_scoring.EMPTY
+            black_points, white_points = go_scoring.score(board, area)
+        else:
+            black_territory, white_territory = self.calculate_territory()
+            black_points, white_points = len(black_territory), len(white_territory)
+            if area:
+                black_points += sum(row.count(Color.BLACK) for row in self.board)
+                white_points += sum(row.count(Color.WHITE) for row in self.board)
+
+        black_score = black_points
+        white_score = white_points + self.komi
+        if not area:
+            # Under territory scoring dead stones also count as prisoners; area scoring already gave their points away
+            white_score += sum(1 for x, y in self.dead_stones if self.board[x][y] == Color.BLACK)
+            black_score += sum(1 for x, y in self.dead_stones if self.board[x][y] == Color.WHITE)
 
         return black_score, white_score
 
@@ -310,54 +674,72 @@ class GomokuGame(BaseBoardGame):
     def __init__(self, size: int, player1_strategy: PlayerStrategy, player2_strategy: PlayerStrategy):
         super().__init__(size, player1_strategy, player2_strategy)
         self.name = "Gomoku Game"
+        self.empty_points = self.collect_empty_points()
+        self.lines = patterns.LineIndex(size, (Color.BLACK, Color.WHITE))
+        self.zobrist = zobrist_table(size)
+        self.board_hash = 0
 
     def move(self, coord: tuple[int, int] | None = None):
-        if coord not in self.check_available_moves():
-            return
         if self.game_over:
             return
         if coord is None:
             logger.warning("Coord cannot be None.")
             return
-        self.history.append(self.create_memento())
+        delta = self.apply(coord)
+        if delta is None:
+            return
+        self.history.append(delta)
         self.replay.append(coord)
+        if self.winner == "Tie":
+            logger.info("Board is full, tie.")
+        elif self.game_over:
+            logger.info(f"{self.winner.upper()} wins.")
+
+    def apply(self, coord: tuple[int, int] | None) -> MoveDelta | None:
+        if self.game_over or coord not in self.empty_points:
+            return None
+        delta = MoveDelta(coord, [], self.undo_state())
         x, y = coord
         self.board[x][y] = self.cur_player()
+        self.empty_points.discard(coord)
+        self.lines.place(coord, self.cur_player())
+        self.board_hash ^= self.zobrist[x][y][self.cur_player()]
         if self.is_five(coord):
             self.game_over = True
             self.winner = "Black" if self.cur_player() == Color.BLACK else "White"
-            logger.info(f"{self.cur_player().value} wins.")
+        elif not self.empty_points:
+            self.game_over = True
+            self.winner = "Tie"
         self.round += 1
+        return delta
 
     def check_available_moves(self) -> list[tuple[int, int]]:
-        available_moves = []
+        return list(self.empty_points)
+
+    def is_legal(self, coord: tuple[int, int]) -> bool:
+        return coord in self.empty_points
+
+    def undo(self, delta: MoveDelta):
+        x, y = delta.coord
+        self.lines.remove(delta.coord, self.board[x][y])
+        self.board_hash ^= self.zobrist[x][y][self.board[x][y]]
+        self.board[x][y] = Color.EMPTY
+        self.empty_points.add(delta.coord)
+        self.restore_undo_state(delta.state)
+
+    def rebuild_lines(self):
+        self.lines = patterns.LineIndex(self.size, (Color.BLACK, Color.WHITE))
         for x in range(self.size):
             for y in range(self.size):
-                if self.board[x][y] == Color.EMPTY:
-                    available_moves.append((x, y))
-        return available_moves
+                if self.board[x][y] != Color.EMPTY:
+                    self.lines.place((x, y), self.board[x][y])
 
     def is_five(self, coord: tuple[int, int], return_max_count: bool = False) -> bool:
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-        count = 1
-        for d in directions:
-            count = max(self.count_in_direction(coord, d[0], d[1]) + self.count_in_direction(coord, -d[0], -d[1]) - 1, count)
-            if self.count_in_direction(coord, d[0], d[1]) + self.count_in_direction(coord, -d[0], -d[1]) - 1 >= 5:
-                if return_max_count:
-                    return True, count
-                return True
+        # Treats coord as holding a stone of the current player
+        shapes = self.lines.shapes(coord, self.cur_player())
         if return_max_count:
-            return False, count
-        return False
-
-    def count_in_direction(self, start: tuple[int, int], dx: int, dy: int) -> int:
-        count = 0
-        x, y = start
-        while 0 <= x < self.size and 0 <= y < self.size and self.board[x][y] == self.cur_player():
-            count += 1
-            x += dx
-            y += dy
-        return count
+            return patterns.FIVE in shapes, self.lines.run(coord, self.cur_player())
+        return patterns.FIVE in shapes
 
     def create_memento(self) -> Memento:
         # Save the current state in a memento
@@ -369,7 +751,7 @@ class GomokuGame(BaseBoardGame):
             "game_over": self.game_over,
             "winner": self.winner,
             # "history": copy.deepcopy(self.history),
-            "replay": copy.deepcopy(self.replay),
+            "replay": list(self.replay),
         }
         return Memento(state)
 
@@ -384,20 +766,11 @@ class GomokuGame(BaseBoardGame):
         self.winner = state["winner"]
         # self.history = state["history"]
         self.replay = state["replay"]
-
-    def save_to_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "wb") as file:
-            pickle.dump((self.create_memento(), {"user1": user1, "user2": user2}), file)
-            logger.info("Game saved to file.")
-
-    def load_from_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "rb") as file:
-            memento, account_info = pickle.load(file)
-            if account_info["user1"] != user1 or account_info["user2"] != user2:
-                logger.warning("The game file does not match the current user.")
-            else:
-                self.restore_from_memento(memento)
-                logger.info("Game loaded from file.")
+        self.history = []
+        self.search_stack = []
+        self.empty_points = self.collect_empty_points()
+        self.rebuild_lines()
+        self.rehash()
 
 
 class OthelloGame(BaseBoardGame):
@@ -409,6 +782,37 @@ class OthelloGame(BaseBoardGame):
         mid = self.size // 2
         self.board[mid - 1][mid - 1] = self.board[mid][mid] = Color.WHITE
         self.board[mid - 1][mid] = self.board[mid][mid - 1] = Color.BLACK
+        # The bitboards are the source of truth for the rules, self.board mirrors them for drawing
+        self.sync_bitboards()
+        self.rehash()
+        # Legal-move masks of both sides for the position in mask_position, filled on demand
+        self.mask_position = None
+        self.masks: dict[Color, int] = {}
+
+    def sync_bitboards(self):
+        self.black = 0
+        self.white = 0
+        for x in range(self.size):
+            for y in range(self.size):
+                if self.board[x][y] == Color.BLACK:
+                    self.black |= 1 << bitboard.square((x, y))
+                elif self.board[x][y] == Color.WHITE:
+                    self.white |= 1 << bitboard.square((x, y))
+
+    def own_and_opp(self) -> tuple[int, int]:
+        return (self.black, self.white) if self.cur_player() == Color.BLACK else (self.white, self.black)
+
+    def legal_mask(self, color: Color | None = None) -> int:
+        color = color or self.cur_player()
+        if self.mask_position != (self.black, self.white):
+            self.mask_position = (self.black, self.white)
+            self.masks = {}
+        if color not in self.masks:
+            if color == Color.BLACK:
+                self.masks[color] = bitboard.legal_moves(self.black, self.white)
+            else:
+                self.masks[color] = bitboard.legal_moves(self.white, self.black)
+        return self.masks[color]
 
     def move(self, coord: tuple[int, int] | None):
         if self.game_over:
@@ -416,81 +820,90 @@ class OthelloGame(BaseBoardGame):
         # if coord is None:
         #     logger.warning("You cannot pass proactively.")
         #     return
-        available_moves = self.check_available_moves()
-        if len(available_moves) == 0:
-            self.history.append(self.create_memento())
-            self.replay.append(None)
+        delta = self.apply(coord)
+        if delta is None:
+            logger.warning("Invalid move.")
+            return
+        self.history.append(delta)
+        self.replay.append(delta.coord)
+
+    def apply(self, coord: tuple[int, int] | None) -> MoveDelta | None:
+        if self.game_over:
+            return None
+        moves = self.legal_mask()
+        if moves == 0:
+            # No legal move: the turn passes whatever coord was asked for
+            delta = MoveDelta(None, [], self.undo_state())
             self.round += 1
+            return delta
+        if coord is None or not moves >> bitboard.square(coord) & 1:
+            return None
+        state = self.undo_state()
+        flipped = self.place(coord)
+        delta = MoveDelta(coord, [(bitboard.coord(sq), self.opposite_player()) for sq in bitboard.squares(flipped)], state)
+        if self.check_game_over():
+            self.game_over = True
+            self.winner = self.get_winner()
+        self.round += 1
+        return delta
+
+    def place(self, coord: tuple[int, int]) -> int:
+        own, opp = self.own_and_opp()
+        sq = bitboard.square(coord)
+        flipped = bitboard.flips(own, opp, sq)
+        own |= flipped | 1 << sq
+        opp &= ~flipped
+        color = self.cur_player()
+        if color == Color.BLACK:
+            self.black, self.white = own, opp
         else:
-            if coord in available_moves:
-                self.history.append(self.create_memento())
-                self.replay.append(coord)
-                self.board[coord[0]][coord[1]] = self.cur_player()
-                self.clamp(coord, clear=True)
-                if self.check_game_over():
-                    self.game_over = True
-                    self.winner = self.get_winner()
-                self.round += 1
-            else:
-                logger.warning("Invalid move.")
+            self.white, self.black = own, opp
+        self.board[coord[0]][coord[1]] = color
+        self.board_hash ^= self.zobrist[coord[0]][coord[1]][color]
+        for flip in bitboard.squares(flipped):
+            x, y = bitboard.coord(flip)
+            self.board[x][y] = color
+            self.board_hash ^= self.zobrist[x][y][Color.BLACK] ^ self.zobrist[x][y][Color.WHITE]
+        return flipped
+
+    def undo_state(self) -> dict:
+        state = super().undo_state()
+        state.update(black=self.black, white=self.white, board_hash=self.board_hash)
+        return state
+
+    def undo(self, delta: MoveDelta):
+        if delta.coord is not None:
+            self.board[delta.coord[0]][delta.coord[1]] = Color.EMPTY
+            for (x, y), color in delta.changed:
+                self.board[x][y] = color
+        self.restore_undo_state(delta.state)
 
     def get_winner(self):
-        black_score = 0
-        white_score = 0
-        for x in range(self.size):
-            for y in range(self.size):
-                if self.board[x][y] == Color.BLACK:
-                    black_score += 1
-                elif self.board[x][y] == Color.WHITE:
-                    white_score += 1
+        black_score = bitboard.count(self.black)
+        white_score = bitboard.count(self.white)
         if black_score > white_score:
             return "Black"
         elif black_score < white_score:
             return "White"
 
     def check_game_over(self) -> bool:
-        # Implement the logic to check if the game is over
-        cur_available_moves = self.check_available_moves()
-        self.round += 1
-        next_available_moves = self.check_available_moves()
-        self.round -= 1
-        return len(cur_available_moves) == 0 and len(next_available_moves) == 0
+        # Neither side can move; whose turn it is does not matter
+        return self.legal_mask(Color.BLACK) == 0 and self.legal_mask(Color.WHITE) == 0
 
     def check_available_moves(self) -> list[tuple[int, int]]:
-        available_moves = []
-        for x in range(self.size):
-            for y in range(self.size):
-                if self.board[x][y] == Color.EMPTY and self.clamp((x, y), clear=False):
-                    available_moves.append((x, y))
-        return available_moves
+        return [bitboard.coord(sq) for sq in bitboard.squares(self.legal_mask())]
 
-    def clamp(self, coord: tuple[int, int], clear: bool = False, return_count: bool = False) -> bool | tuple[bool, int]:
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (0, -1), (-1, -1), (-1, 1)]
-        if return_count:
-            return any([self.clamp_direction(coord, d[0], d[1], clear=clear, return_count=return_count)[0] for d in directions]), sum(
-                [self.clamp_direction(coord, d[0], d[1], clear=clear, return_count=return_count)[1] for d in directions]
-            )
-        return any([self.clamp_direction(coord, d[0], d[1], clear=clear) for d in directions])
+    def is_legal(self, coord: tuple[int, int]) -> bool:
+        return self.legal_mask() >> bitboard.square(coord) & 1 == 1
 
-    def clamp_direction(self, coord: tuple[int, int], dx: int, dy: int, clear: bool = False, return_count: bool = False) -> bool | tuple[bool, int]:
-        x, y = coord
-        x += dx
-        y += dy
-        opposite_list = []
-        while 0 <= x < self.size and 0 <= y < self.size and self.board[x][y] == self.opposite_player():
-            opposite_list.append((x, y))
-            x += dx
-            y += dy
-        if 0 <= x < self.size and 0 <= y < self.size and self.board[x][y] == self.cur_player():
-            if clear:
-                for opposite in opposite_list:
-                    self.board[opposite[0]][opposite[1]] = self.cur_player()
-            if return_count:
-                return len(opposite_list) > 0, len(opposite_list)
-            return len(opposite_list) > 0
+    def clamp(self, coord: tuple[int, int], clear: bool = False, return_count: bool = False) -> bool | tuple[bool, int]:
+        own, opp = self.own_and_opp()
+        flipped = bitboard.flips(own, opp, bitboard.square(coord))
+        if clear and flipped:
+            self.place(coord)
         if return_count:
-            return False, 0
-        return False
+            return flipped != 0, bitboard.count(flipped)
+        return flipped != 0
 
     def create_memento(self) -> Memento:
         # Save the current state in a memento
@@ -502,7 +915,7 @@ class OthelloGame(BaseBoardGame):
             "game_over": self.game_over,
             "winner": self.winner,
             # "history": copy.deepcopy(self.history),
-            "replay": copy.deepcopy(self.replay),
+            "replay": list(self.replay),
         }
         return Memento(state)
 
@@ -517,20 +930,10 @@ class OthelloGame(BaseBoardGame):
         self.winner = state["winner"]
         # self.history = state["history"]
         self.replay = state["replay"]
-
-    def save_to_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "wb") as file:
-            pickle.dump((self.create_memento(), {"user1": user1, "user2": user2}), file)
-            logger.info("Game saved to file.")
-
-    def load_from_file(self, file_path: str, user1: str, user2: str):
-        with open(file_path, "rb") as file:
-            memento, account_info = pickle.load(file)
-            if account_info["user1"] != user1 or account_info["user2"] != user2:
-                logger.warning("The game file does not match the current user.")
-            else:
-                self.restore_from_memento(memento)
-                logger.info("Game loaded from file.")
+        self.history = []
+        self.search_stack = []
+        self.sync_bitboards()
+        self.rehash()
 
 
 class PlayerStrategy(ABC):
@@ -544,6 +947,10 @@ class PlayerStrategy(ABC):
     def make_move(self, game: BaseBoardGame) -> tuple[int, int] | None:
         pass
 
+    def close(self):
+        # Releases what the strategy holds outside the process, such as worker processes; called when it is replaced
+        pass
+
 
 class HumanPlayerStrategy(PlayerStrategy):
     role = "Human"
@@ -569,23 +976,103 @@ class Level1AIPlayerStrategy(PlayerStrategy):
         return random.choice(available_moves)
 
 
+SHAPE_SCORES = {
+    patterns.NONE: 0,
+    patterns.ONE: 1,
+    patterns.TWO: 10,
+    patterns.THREE: 100,
+    patterns.OPEN_THREE: 1000,
+    patterns.FOUR: 1000,
+    patterns.OPEN_FOUR: 10000,
+    patterns.FIVE: 100000,
+}
+
+# Weights of five-point windows holding k = 0..5 stones of one color and none of the other, for the batched Gomoku
+# evaluation after our move; the opponent's windows weigh more because the opponent moves next
+WINDOW_WEIGHTS_OWN = [0, 1, 12, 150, 2500, 1000000]
+WINDOW_WEIGHTS_OPP = [0, 1, 15, 400, 60000, 1000000]
+
+# Built with opening_book.py from self-play records; a missing file just means no book moves
+OPENING_BOOKS = {"Othello Game": "othello.book", "Gomoku Game": "gomoku.book"}
+_opening_books: dict[str, OpeningBook | None] = {}
+
+
+def book_move(game: BaseBoardGame) -> tuple[int, int] | None:
+    if game.name not in OPENING_BOOKS:
+        return None
+    if game.name not in _opening_books:
+        try:
+            _opening_books[game.name] = OpeningBook(OPENING_BOOKS[game.name])
+        except FileNotFoundError:
+            _opening_books[game.name] = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Opening book not used: {e}")
+            _opening_books[game.name] = None
+    book = _opening_books[game.name]
+    if book is None or book.size != game.size:
+        return None
+    move = book.choose(game.position_key)
+    if move is None or not game.is_legal(move):
+        return None
+    logger.info(f"Book move: {move}")
+    return move
+
+
+def best_reply_flips(children: list[tuple[int, int, int]]) -> list[int]:
+    # Most discs the opponent can flip in reply to each (flips, own, opp) child position, -99999999 if it must pass
+    if batch_eval is not None:
+        own = np.array([child[1] for child in children], dtype=np.uint64)
+        opp = np.array([child[2] for child in children], dtype=np.uint64)
+        replies = batch_eval.othello_mobility(opp, own)
+        # One row per (child, reply) pair, all scored in one call
+        index = [i for i, moves in enumerate(replies) for _ in bitboard.squares(int(moves))]
+        squares = [sq for moves in replies for sq in bitboard.squares(int(moves))]
+        best = np.full(len(children), -99999999, dtype=np.int64)
+        if index:
+            np.maximum.at(best, index, batch_eval.othello_flip_counts(opp[index], own[index], np.array(squares)))
+        return best.tolist()
+    best = []
+    for _, next_own, next_opp in children:
+        best_opposite_score = -99999999
+        for i in bitboard.squares(bitboard.legal_moves(next_opp, next_own)):
+            opposite_score = bitboard.count(bitboard.flips(next_opp, next_own, i))
+            if opposite_score > best_opposite_score:
+                best_opposite_score = opposite_score
+        best.append(best_opposite_score)
+    return best
+
+
 class Level2AIPlayerStrategy(PlayerStrategy):
     role = "Level2 AI"
 
     # Simple Rules
     def make_move(self, game: BaseBoardGame) -> tuple[int, int] | None:
+        move = book_move(game)
+        if move is not None:
+            return move
         if game.name == "Gomoku Game":
             available_moves = game.check_available_moves()
-            best_move = random.choice(available_moves)
+            if len(available_moves) == 0:
+                return None
+            opponent = Color.WHITE if self.color == Color.BLACK else Color.BLACK
+            if batch_eval is not None:
+                # Every candidate board at once, scored by the open five-point windows each side has afterwards
+                me = batch_eval.BLACK if self.color == Color.BLACK else batch_eval.WHITE
+                boards = batch_eval.place_each(batch_eval.to_array(game.board), available_moves, me)
+                scores = batch_eval.line_counts(boards, me) @ WINDOW_WEIGHTS_OWN - batch_eval.line_counts(boards, 3 - me) @ WINDOW_WEIGHTS_OPP
+                return available_moves[random.choice(list((scores == scores.max()).nonzero()[0]))]
+            best_moves = []
             best_score = -1
-            for x, y in available_moves:
-                game.board[x][y] = self.color
-                _, score = game.is_five((x, y), return_max_count=True)
+            for coord in available_moves:
+                # Building our own lines and breaking the opponent's are scored from the same table lookups
+                score = sum(SHAPE_SCORES[shape] for shape in game.lines.shapes(coord, self.color))
+                score += 0.9 * sum(SHAPE_SCORES[shape] for shape in game.lines.shapes(coord, opponent))
                 if score > best_score:
-                    best_move = (x, y)
+                    best_moves = [coord]
                     best_score = score
-                game.board[x][y] = Color.EMPTY
-            return best_move
+                elif score == best_score:
+                    best_moves.append(coord)
+            return random.choice(best_moves)
         elif game.name == "Othello Game":
             available_moves = game.check_available_moves()
             if len(available_moves) == 0:
@@ -597,47 +1084,122 @@ class Level2AIPlayerStrategy(PlayerStrategy):
                 + [(x, 0) for x in range(game.size)]
                 + [(x, game.size - 1) for x in range(game.size)]
             )
+            own, opp = game.own_and_opp()
+            if 64 - bitboard.count(own | opp) <= ENDGAME_EMPTIES:
+                # Few enough empties to play the rest perfectly
+                try:
+                    sq, discs = EndgameSolver().solve(own, opp)
+                    logger.info(f"Endgame solved: {discs:+d} discs")
+                    return bitboard.coord(sq)
+                except SearchTimeout:
+                    pass
             for x, y in available_moves:
                 if (x, y) in corner_points:
                     return x, y
             best_move = random.choice(available_moves)
             best_score = -99999999
+            children = []
             for x, y in available_moves:
-                board_back = copy.deepcopy(game.board)
-                game.board[x][y] = self.color
-                game.round += 1
-                _, score = game.clamp((x, y), clear=True, return_count=True)
-
-                opposite_available_moves = game.check_available_moves()
-                best_opposite_score = -99999999
-                for i, j in opposite_available_moves:
-                    game.board[i][j] = Color.WHITE if self.color == Color.BLACK else Color.BLACK
-                    game.round += 1
-                    _, opposite_score = game.clamp((i, j), clear=False, return_count=True)
-                    if opposite_score > best_opposite_score:
-                        best_opposite_score = opposite_score
-                    game.board[i][j] = Color.EMPTY
-                    game.round -= 1
-
+                sq = bitboard.square((x, y))
+                flipped = bitboard.flips(own, opp, sq)
+                children.append((bitboard.count(flipped), own | flipped | 1 << sq, opp & ~flipped))
+            for (x, y), (score, _, _), best_opposite_score in zip(available_moves, children, best_reply_flips(children)):
                 if (x, y) in edge_points:
                     score += 0.5
                 score -= best_opposite_score
                 if score > best_score:
                     best_move = (x, y)
                     best_score = score
-                game.round -= 1
-                game.board = board_back
             logger.info(f"Best score: {best_score}, best move: {best_move}")
             return best_move
+        elif game.name == "Go Game" and batch_eval is not None:
+            return self.go_move(game)
+
+    def go_move(self, game: GoGame) -> tuple[int, int] | None:
+        # Tactics from liberty counts of every candidate board at once: capture, put in atari, escape atari,
+        # avoid self-atari and never fill our own eyes. Passes when nothing scores above zero.
+        me = batch_eval.BLACK if self.color == Color.BLACK else batch_eval.WHITE
+        them = 3 - me
+        board = batch_eval.to_array(game.board)
+        moves = [
+            (x, y)
+            for x, y in game.check_available_moves()
+            if not all(game.board[nx][ny] == self.color for nx, ny in game.neighbors((x, y)))
+        ]
+        if not moves:
+            return None
+        before = batch_eval.liberties(board[np.newaxis])[0]
+        own_atari = int(((board == me) & (before == 1)).sum())
+        opp_atari = int(((board == them) & (before == 1)).sum())
+        boards = batch_eval.place_each(board, moves, me)
+        libs = batch_eval.liberties(boards)
+        xs, ys = np.array(moves).T
+        move_libs = libs[np.arange(len(moves)), xs, ys]
+        captured = ((boards == them) & (libs == 0)).sum(axis=(1, 2))
+        atari = ((boards == them) & (libs == 1)).sum(axis=(1, 2)) - opp_atari
+        rescued = own_atari - ((boards == me) & (libs == 1)).sum(axis=(1, 2))
+        self_atari = (move_libs == 1) & (captured == 0)
+        line = np.minimum(np.minimum(xs, ys), np.minimum(game.size - 1 - xs, game.size - 1 - ys))
+        scores = 10 * captured + 3 * atari + 5 * rescued + np.minimum(move_libs, 4) - 8 * self_atari + (line >= 2) + np.array([random.random() for _ in moves])
+        scores[(move_libs == 0) & (captured == 0)] = -np.inf  # suicide
+        for i in np.argsort(-scores):
+            if scores[i] <= 0:
+                break
+            if game.is_legal(moves[i]):
+                return moves[i]
+        return None
 
 
 class Level3AIPlayerStrategy(PlayerStrategy):
     role = "Level3 AI"
+    time_limit = 1.0  # seconds per move
+    go_playouts = None  # optional playout budget per move on top of the time limit
+    workers = 1  # processes for Go and Othello; more than one searches in parallel at the root
+    othello_searcher = None
+    go_engine = None
+    threat_searcher = None
+    parallel_search = None
 
     def make_move(self, game: BaseBoardGame) -> tuple[int, int] | None:
+        move = book_move(game)
+        if move is not None:
+            return move
+        if game.name == "Gomoku Game":
+            if self.threat_searcher is None:
+                # Four searches per move share the time budget
+                self.threat_searcher = ThreatSearcher(self.time_limit / 4)
+            for vct in (False, True):
+                # Our forced win first, unless the opponent's is faster; then the defence against it
+                sequence = self.threat_searcher.solve(game, self.color, vct)
+                if sequence:
+                    return sequence[0]
+                defence = self.threat_searcher.defend(game, self.color, vct)
+                if defence is not None:
+                    return defence
+            return Level2AIPlayerStrategy(self.color).make_move(game)
+        if self.workers > 1 and game.name in ("Go Game", "Othello Game"):
+            if self.parallel_search is None:
+                self.parallel_search = ParallelSearch(self.workers, self.time_limit, self.go_playouts)
+            return self.parallel_search.best_move(game)
+        if game.name == "Go Game":
+            if self.go_engine is None:
+                # Kept across moves so the search tree is reused
+                self.go_engine = GoMCTS(self.time_limit, self.go_playouts)
+            return self.go_engine.best_move(game)
+        if game.name == "Othello Game":
+            if self.othello_searcher is None:
+                # Kept across moves so the transposition table carries over
+                self.othello_searcher = OthelloSearcher(self.time_limit)
+            sq = self.othello_searcher.search(*game.own_and_opp())
+            return None if sq is None else bitboard.coord(sq)
         available_moves = game.check_available_moves()
         if game.allow_none_move:
             available_moves.append(None)
         if len(available_moves) == 0:
             return None
         return random.choice(available_moves)
+
+    def close(self):
+        if self.parallel_search is not None:
+            self.parallel_search.shutdown()
+            self.parallel_search = None
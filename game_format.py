@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import struct
+
+# Version 1 layout, little-endian:
+#   header     magic, version, game, size, flags (bit 0: game over), round, winner, komi in half points,
+#              ko point (index + 1, 0 for none), consecutive passes
+#   strings    user1, user2, final score: varint byte length, then UTF-8
+#   board      2 bits per point (0 empty, 1 black, 2 white), point (x, y) at index x * size + y, 4 points per byte
+#   moves      varint count, then one varint per move: index + 1, or 0 for a pass
+MAGIC = b"GAME"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBIBhHB")
+GAMES = ["Go Game", "Gomoku Game", "Othello Game"]
+WINNERS = ["", "Black", "White", "Tie", None]  # Othello reports a draw as None
+GAME_OVER = 1
+
+
+class GameFormatError(ValueError):
+    pass
+
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise GameFormatError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def write_string(out: bytearray, text: str):
+    encoded = text.encode("utf-8")
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def read_string(data: bytes, pos: int) -> tuple[str, int]:
+    length, pos = read_varint(data, pos)
+    if pos + length > len(data):
+        raise GameFormatError("truncated string")
+    try:
+        return data[pos : pos + length].decode("utf-8"), pos + length
+    except UnicodeDecodeError as e:
+        raise GameFormatError(f"string is not UTF-8: {e}") from None
+
+
+# The four cell codes held by each byte value, lowest bits first
+BYTE_CELLS = [(byte & 3, byte >> 2 & 3, byte >> 4 & 3, byte >> 6) for byte in range(256)]
+
+
+def pack_board(cells: list[list[int]]) -> bytes:
+    flat = [code for row in cells for code in row]
+    flat += [0] * (-len(flat) % 4)
+    return bytes(flat[i] | flat[i + 1] << 2 | flat[i + 2] << 4 | flat[i + 3] << 6 for i in range(0, len(flat), 4))
+
+
+def unpack_board(packed: bytes, size: int) -> list[list[int]]:
+    flat = [code for byte in packed for code in BYTE_CELLS[byte]]
+    return [flat[x * size : (x + 1) * size] for x in range(size)]
+
+
+class GameRecord:
+    # One saved game. The board is unpacked on load; the move list stays encoded until moves is first read.
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        cells: list[list[int]],
+        round: int,
+        game_over: bool,
+        winner: str | None,
+        user1: str = "",
+        user2: str = "",
+        komi: float = 0.0,
+        ko_point: tuple[int, int] | None = None,
+        abstention: int = 0,
+        final_score: str = "",
+        moves: list[tuple[int, int] | None] | None = None,
+    ):
+        self.name = name
+        self.size = size
+        self.cells = cells
+        self.round = round
+        self.game_over = game_over
+        self.winner = winner
+        self.user1 = user1
+        self.user2 = user2
+        self.komi = komi
+        self.ko_point = ko_point
+        self.abstention = abstention
+        self.final_score = final_score
+        self._moves = moves
+        self._encoded_moves = b""
+
+    @property
+    def moves(self) -> list[tuple[int, int] | None]:
+        if self._moves is None:
+            self._moves = decode_moves(self._encoded_moves, self.size)
+        return self._moves
+
+    def to_bytes(self) -> bytes:
+        flags = GAME_OVER if self.game_over else 0
+        ko = 0 if self.ko_point is None else self.ko_point[0] * self.size + self.ko_point[1] + 1
+        out = bytearray(
+            HEADER.pack(MAGIC, VERSION, GAMES.index(self.name), self.size, flags, self.round, WINNERS.index(self.winner), round(self.komi * 2), ko, self.abstention)
+        )
+        write_string(out, self.user1)
+        write_string(out, self.user2)
+        write_string(out, self.final_score)
+        out += pack_board(self.cells)
+        out += encode_moves(self.moves, self.size)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> GameRecord:
+        if len(data) < HEADER.size:
+            raise GameFormatError("file too short for a game header")
+        magic, version, game, size, flags, round, winner, komi, ko, abstention = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise GameFormatError("not a saved game")
+        if version != VERSION:
+            raise GameFormatError(f"unsupported game file version {version}")
+        if game >= len(GAMES) or winner >= len(WINNERS):
+            raise GameFormatError("corrupt game header")
+        pos = HEADER.size
+        user1, pos = read_string(data, pos)
+        user2, pos = read_string(data, pos)
+        final_score, pos = read_string(data, pos)
+        board_bytes = (size * size + 3) // 4
+        if pos + board_bytes > len(data):
+            raise GameFormatError("truncated board")
+        cells = unpack_board(data[pos : pos + board_bytes], size)
+        record = cls(
+            GAMES[game],
+            size,
+            cells,
+            round,
+            bool(flags & GAME_OVER),
+            WINNERS[winner],
+            user1,
+            user2,
+            komi / 2,
+            None if ko == 0 else divmod(ko - 1, size),
+            abstention,
+            final_score,
+        )
+        record._encoded_moves = data[pos + board_bytes :]
+        check_moves(record._encoded_moves, size)
+        return record
+
+
+def encode_moves(moves: list[tuple[int, int] | None], size: int) -> bytes:
+    out = bytearray()
+    write_varint(out, len(moves))
+    for move in moves:
+        write_varint(out, 0 if move is None else move[0] * size + move[1] + 1)
+    return bytes(out)
+
+
+def check_moves(data: bytes, size: int):
+    # One pass over an encoded move list without building it, so a damaged file is rejected when it is read rather
+    # than when its moves are first needed
+    count, pos = read_varint(data, 0)
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        if value > size * size:
+            raise GameFormatError(f"move {value - 1} is off the {size}x{size} board")
+    if pos != len(data):
+        raise GameFormatError("trailing bytes after the move list")
+
+
+def decode_moves(data: bytes, size: int) -> list[tuple[int, int] | None]:
+    count, pos = read_varint(data, 0)
+    moves = []
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        moves.append(None if value == 0 else divmod(value - 1, size))
+    return moves
+
+
+def write(path: str, record: GameRecord):
+    with open(path, "wb") as file:
+        file.write(record.to_bytes())
+
+
+def read(path: str) -> GameRecord:
+    with open(path, "rb") as file:
+        return GameRecord.from_bytes(file.read())
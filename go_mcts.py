@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+
+from loguru import logger
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+PASS = -1
+
+
+class FastGoBoard:
+    # Flat (size + 2)^2 array with a border ring, for playouts; only simple ko and no suicide
+    def __init__(self, size: int):
+        self.size = size
+        self.stride = size + 2
+        self.cells = [BORDER] * (self.stride * self.stride)
+        self.points = [(x + 1) * self.stride + y + 1 for x in range(size) for y in range(size)]
+        for pt in self.points:
+            self.cells[pt] = EMPTY
+        self.offsets = (-1, 1, -self.stride, self.stride)
+        self.diagonals = (-self.stride - 1, -self.stride + 1, self.stride - 1, self.stride + 1)
+        self.empties = list(self.points)
+        self.empty_index = [-1] * len(self.cells)
+        for i, pt in enumerate(self.empties):
+            self.empty_index[pt] = i
+        self.ko = PASS
+
+    @classmethod
+    def from_game(cls, game) -> FastGoBoard:
+        board = cls(game.size)
+        for x in range(game.size):
+            for y in range(game.size):
+                value = game.board[x][y].value
+                if value != "EMPTY":
+                    board.put(board.point((x, y)), BLACK if value == "BLACK" else WHITE)
+        if game.ko_point is not None:
+            board.ko = board.point(game.ko_point)
+        return board
+
+    def copy(self) -> FastGoBoard:
+        board = FastGoBoard.__new__(FastGoBoard)
+        board.size = self.size
+        board.stride = self.stride
+        board.cells = self.cells[:]
+        board.points = self.points
+        board.offsets = self.offsets
+        board.diagonals = self.diagonals
+        board.empties = self.empties[:]
+        board.empty_index = self.empty_index[:]
+        board.ko = self.ko
+        return board
+
+    def point(self, coord: tuple[int, int]) -> int:
+        return (coord[0] + 1) * self.stride + coord[1] + 1
+
+    def coord(self, pt: int) -> tuple[int, int]:
+        return pt // self.stride - 1, pt % self.stride - 1
+
+    def put(self, pt: int, color: int):
+        self.cells[pt] = color
+        index = self.empty_index[pt]
+        last = self.empties.pop()
+        if last != pt:
+            self.empties[index] = last
+            self.empty_index[last] = index
+        self.empty_index[pt] = -1
+
+    def clear(self, pt: int):
+        self.cells[pt] = EMPTY
+        self.empty_index[pt] = len(self.empties)
+        self.empties.append(pt)
+
+    def has_liberty_except(self, start: int, excluded: int) -> bool:
+        cells = self.cells
+        color = cells[start]
+        seen = {start}
+        stack = [start]
+        while stack:
+            pt = stack.pop()
+            for offset in self.offsets:
+                nbr = pt + offset
+                cell = cells[nbr]
+                if cell == EMPTY:
+                    if nbr != excluded:
+                        return True
+                elif cell == color and nbr not in seen:
+                    seen.add(nbr)
+                    stack.append(nbr)
+        return False
+
+    def remove_group(self, start: int) -> int:
+        cells = self.cells
+        color = cells[start]
+        stack = [start]
+        self.clear(start)
+        removed = 1
+        while stack:
+            pt = stack.pop()
+            for offset in self.offsets:
+                nbr = pt + offset
+                if cells[nbr] == color:
+                    self.clear(nbr)
+                    removed += 1
+                    stack.append(nbr)
+        return removed
+
+    def is_eye(self, pt: int, color: int) -> bool:
+        # Every neighbour is ours and the opponent holds at most one diagonal (none on the edge)
+        cells = self.cells
+        for offset in self.offsets:
+            if cells[pt + offset] != color and cells[pt + offset] != BORDER:
+                return False
+        bad = 0
+        edge = False
+        for offset in self.diagonals:
+            cell = cells[pt + offset]
+            if cell == BORDER:
+                edge = True
+            elif cell != color and cell != EMPTY:
+                bad += 1
+        return bad == 0 if edge else bad <= 1
+
+    def play(self, pt: int, color: int) -> bool:
+        if pt == PASS:
+            self.ko = PASS
+            return True
+        cells = self.cells
+        if cells[pt] != EMPTY or pt == self.ko:
+            return False
+        opponent = 3 - color
+        captures = []
+        alive = False
+        for offset in self.offsets:
+            nbr = pt + offset
+            cell = cells[nbr]
+            if cell == EMPTY:
+                alive = True
+            elif cell == opponent:
+                if nbr not in captures and not self.has_liberty_except(nbr, pt):
+                    captures.append(nbr)
+            elif cell == color and not alive and self.has_liberty_except(nbr, pt):
+                alive = True
+        if not alive and not captures:
+            return False
+        self.put(pt, color)
+        removed = 0
+        last_capture = PASS
+        for nbr in captures:
+            if cells[nbr] == opponent:
+                removed += self.remove_group(nbr)
+                last_capture = nbr
+        self.ko = PASS
+        if removed == 1 and all(cells[pt + offset] != color for offset in self.offsets):
+            self.ko = last_capture
+        return True
+
+    def random_move(self, color: int) -> int:
+        empties = self.empties
+        count = len(empties)
+        if count == 0:
+            return PASS
+        start = random.randrange(count)
+        for i in range(count):
+            pt = empties[(start + i) % count]
+            if not self.is_eye(pt, color) and self.play(pt, color):
+                return pt
+        self.ko = PASS
+        return PASS
+
+    def playout(self, color: int, max_moves: int) -> int:
+        # Plays random non-eye-filling moves until two passes; returns the color to move afterwards
+        passes = 0
+        moves = 0
+        while passes < 2 and moves < max_moves:
+            passes = passes + 1 if self.random_move(color) == PASS else 0
+            color = 3 - color
+            moves += 1
+        return color
+
+    def area_score(self, komi: float) -> float:
+        # Black minus White, counting stones and empty points whose neighbours are all one color
+        cells = self.cells
+        score = -komi
+        for pt in self.points:
+            cell = cells[pt]
+            if cell == EMPTY:
+                owner = EMPTY
+                for offset in self.offsets:
+                    nbr = cells[pt + offset]
+                    if nbr == BORDER:
+                        continue
+                    if owner == EMPTY:
+                        owner = nbr
+                    elif nbr != owner:
+                        owner = BORDER
+                        break
+                cell = owner
+            if cell == BLACK:
+                score += 1
+            elif cell == WHITE:
+                score -= 1
+        return score
+
+    def is_legal(self, pt: int, color: int) -> bool:
+        cells = self.cells
+        if cells[pt] != EMPTY or pt == self.ko:
+            return False
+        for offset in self.offsets:
+            nbr = pt + offset
+            cell = cells[nbr]
+            if cell == EMPTY:
+                return True
+            if cell == color:
+                if self.has_liberty_except(nbr, pt):
+                    return True
+            elif cell != BORDER and not self.has_liberty_except(nbr, pt):
+                return True
+        return False
+
+    def legal_moves(self, color: int) -> list[int]:
+        return [pt for pt in self.empties if not self.is_eye(pt, color) and self.is_legal(pt, color)]
+
+
+class NodePool:
+    # Tree nodes as parallel preallocated lists; children of a node are allocated as one contiguous block
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.move = [PASS] * capacity
+        self.parent = [-1] * capacity
+        self.first_child = [-1] * capacity
+        self.child_count = [0] * capacity
+        self.visits = [0] * capacity
+        self.wins = [0.0] * capacity
+        self.used = 0
+
+    def reset(self):
+        self.used = 0
+
+    def allocate(self, count: int) -> int:
+        if self.used + count > self.capacity:
+            return -1
+        start = self.used
+        self.used += count
+        for node in range(start, start + count):
+            self.first_child[node] = -1
+            self.child_count[node] = 0
+            self.visits[node] = 0
+            self.wins[node] = 0.0
+        return start
+
+
+class GoMCTS:
+    # UCT over FastGoBoard playouts; the tree is kept between moves and re-rooted on the moves actually played
+    def __init__(self, time_limit: float = 1.0, playouts: int | None = None, capacity: int = 200000, exploration: float = 0.7):
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.exploration = exploration
+        self.pool = NodePool(capacity)
+        self.root = -1
+        self.root_board: FastGoBoard | None = None
+        self.root_color = BLACK
+        self.root_replay: list = []
+        self.size = 0
+        self.komi = 0.0
+        self.playouts_done = 0
+        self.pps = 0.0
+
+    def sync(self, game):
+        # Walk the existing tree along the moves played since the last search, or start over
+        replay = list(game.replay)
+        color = BLACK if game.cur_player().value == "BLACK" else WHITE
+        node = self.root
+        if self.root_board is not None and game.size == self.size and replay[: len(self.root_replay)] == self.root_replay:
+            for played in replay[len(self.root_replay) :]:
+                target = PASS if played is None else self.root_board.point(played)
+                node = self.find_child(node, target)
+                if node < 0:
+                    break
+        else:
+            node = -1
+        if node < 0 or self.pool.used > self.pool.capacity * 0.8:
+            self.pool.reset()
+            node = self.pool.allocate(1)
+            self.pool.parent[node] = -1
+        self.root = node
+        self.root_board = FastGoBoard.from_game(game)
+        self.root_color = color
+        self.root_replay = replay
+        self.size = game.size
+        self.komi = game.komi
+
+    def find_child(self, node: int, move: int) -> int:
+        if node < 0:
+            return -1
+        first = self.pool.first_child[node]
+        for child in range(first, first + self.pool.child_count[node]):
+            if self.pool.move[child] == move:
+                return child
+        return -1
+
+    def expand(self, node: int, board: FastGoBoard, color: int):
+        moves = board.legal_moves(color)
+        random.shuffle(moves)
+        moves.append(PASS)
+        start = self.pool.allocate(len(moves))
+        if start < 0:
+            return  # pool exhausted, this node stays a leaf
+        for i, move in enumerate(moves):
+            self.pool.move[start + i] = move
+            self.pool.parent[start + i] = node
+        self.pool.first_child[node] = start
+        self.pool.child_count[node] = len(moves)
+
+    def select(self, node: int) -> int:
+        pool = self.pool
+        first = pool.first_child[node]
+        log_visits = math.log(pool.visits[node] + 1)
+        best = first
+        best_value = -1.0
+        for child in range(first, first + pool.child_count[node]):
+            visits = pool.visits[child]
+            if visits == 0:
+                return child
+            value = pool.wins[child] / visits + self.exploration * math.sqrt(log_visits / visits)
+            if value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def run_playout(self):
+        pool = self.pool
+        board = self.root_board.copy()
+        color = self.root_color
+        node = self.root
+        passes = 0
+        max_moves = 3 * self.size * self.size
+        while pool.child_count[node] > 0 and passes < 2:
+            node = self.select(node)
+            move = pool.move[node]
+            board.play(move, color)
+            passes = passes + 1 if move == PASS else 0
+            color = 3 - color
+        if passes < 2:
+            if pool.visits[node] > 0 or node == self.root:
+                self.expand(node, board, color)
+            board.playout(color, max_moves)
+        winner = BLACK if board.area_score(self.komi) > 0 else WHITE
+        # Each node is credited from the view of the player who made the move leading to it
+        mover = 3 - color
+        while node >= 0:
+            pool.visits[node] += 1
+            if winner == mover:
+                pool.wins[node] += 1
+            mover = 3 - mover
+            node = pool.parent[node] if node != self.root else -1
+
+    def search(self, game) -> list[tuple[tuple[int, int] | None, int, float]]:
+        # Returns (move, visits, win rate) for every root child, most visited first
+        self.sync(game)
+        start = time.perf_counter()
+        deadline = start + self.time_limit
+        done = 0
+        while (self.playouts is None or done < self.playouts) and time.perf_counter() < deadline:
+            self.run_playout()
+            done += 1
+        elapsed = time.perf_counter() - start
+        self.playouts_done = done
+        self.pps = done / elapsed if elapsed > 0 else 0.0
+        pool = self.pool
+        first = pool.first_child[self.root]
+        results = []
+        for child in range(first, first + pool.child_count[self.root]):
+            move = pool.move[child]
+            visits = pool.visits[child]
+            results.append((None if move == PASS else self.root_board.coord(move), visits, pool.wins[child] / visits if visits else 0.0))
+        results.sort(key=lambda result: -result[1])
+        logger.info(f"Go MCTS: {done} playouts, {self.pps:.0f} playouts/s, {pool.used} nodes")
+        return results
+
+    def best_move(self, game) -> tuple[int, int] | None:
+        for move, visits, _ in self.search(game):
+            if move is None or game.is_legal(move):
+                return move
+        return None
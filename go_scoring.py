@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import numpy as np
+
+from go_mcts import BLACK, EMPTY, WHITE, FastGoBoard
+
+
+def to_array(board) -> np.ndarray:
+    # GoGame.board (a grid of Color) as an int8 array
+    codes = {"EMPTY": EMPTY, "BLACK": BLACK, "WHITE": WHITE}
+    return np.array([[codes[cell.value] for cell in row] for row in board], dtype=np.int8)
+
+
+def neighbor_any(mask: np.ndarray) -> np.ndarray:
+    # True where at least one of the four neighbours (within the same board) is True
+    result = np.zeros_like(mask)
+    result[:, 1:, :] |= mask[:, :-1, :]
+    result[:, :-1, :] |= mask[:, 1:, :]
+    result[:, :, 1:] |= mask[:, :, :-1]
+    result[:, :, :-1] |= mask[:, :, 1:]
+    return result
+
+
+def label_regions(empty: np.ndarray) -> np.ndarray:
+    # Connected empty regions of a (N, size, size) stack. Every empty point ends up labelled with the smallest flat
+    # index in its region, other points with -1. Labels spread to neighbours and then jump along chains of labels,
+    # so long snaking regions converge in a few rounds.
+    count = empty.size
+    sentinel = count
+    flat = np.arange(count, dtype=np.int64).reshape(empty.shape)
+    labels = np.where(empty, flat, sentinel)
+    while True:
+        spread = labels.copy()
+        spread[:, 1:, :] = np.minimum(spread[:, 1:, :], labels[:, :-1, :])
+        spread[:, :-1, :] = np.minimum(spread[:, :-1, :], labels[:, 1:, :])
+        spread[:, :, 1:] = np.minimum(spread[:, :, 1:], labels[:, :, :-1])
+        spread[:, :, :-1] = np.minimum(spread[:, :, :-1], labels[:, :, 1:])
+        spread = np.where(empty, spread, sentinel)
+        lookup = np.append(spread.ravel(), sentinel)
+        spread = np.minimum(spread, lookup[spread])
+        if np.array_equal(spread, labels):
+            return np.where(empty, labels, -1)
+        labels = spread
+
+
+def territory(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Boolean masks of black and white territory. As in GoGame.calculate_territory, a region belongs to Black
+    # unless it touches a white stone, and to White if it touches only white stones.
+    empty = boards == EMPTY
+    labels = label_regions(empty)
+    points = labels[empty]
+    touches_black = np.bincount(points, weights=neighbor_any(boards == BLACK)[empty], minlength=boards.size) > 0
+    touches_white = np.bincount(points, weights=neighbor_any(boards == WHITE)[empty], minlength=boards.size) > 0
+    black = np.zeros(boards.shape, dtype=bool)
+    white = np.zeros(boards.shape, dtype=bool)
+    black[empty] = ~touches_white[points]
+    white[empty] = touches_white[points] & ~touches_black[points]
+    return black, white
+
+
+def score(boards: np.ndarray, area: bool = False) -> tuple[np.ndarray | int, np.ndarray | int]:
+    # Black and white points of one (size, size) board or of every board in a (N, size, size) stack: territory
+    # only, or territory plus stones on the board when area is set. Komi and captures are left to the caller.
+    boards = np.asarray(boards, dtype=np.int8)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[np.newaxis]
+    black, white = territory(boards)
+    black_score = black.sum(axis=(1, 2))
+    white_score = white.sum(axis=(1, 2))
+    if area:
+        black_score += (boards == BLACK).sum(axis=(1, 2))
+        white_score += (boards == WHITE).sum(axis=(1, 2))
+    if single:
+        return int(black_score[0]), int(white_score[0])
+    return black_score, white_score
+
+
+def ownership(game, playouts: int = 64) -> np.ndarray:
+    # Expected owner of every point of a GoGame, from +1 (always Black's) to -1 (always White's), over light
+    # random playouts from the current position. The end positions are scored together as one stack.
+    root = FastGoBoard.from_game(game)
+    color = BLACK if game.cur_player().value == "BLACK" else WHITE
+    points = np.array(root.points)
+    boards = np.empty((playouts, game.size, game.size), dtype=np.int8)
+    for i in range(playouts):
+        board = root.copy()
+        board.playout(color, 3 * game.size * game.size)
+        boards[i] = np.array(board.cells, dtype=np.int8)[points].reshape(game.size, game.size)
+    black, white = territory(boards)
+    return ((boards == BLACK) | black).mean(axis=0) - ((boards == WHITE) | white).mean(axis=0)
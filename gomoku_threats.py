@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import copy
+import time
+
+from loguru import logger
+
+import patterns
+
+FOUR_SHAPES = (patterns.FOUR, patterns.OPEN_FOUR)
+THREE_SHAPES = (patterns.OPEN_THREE,)
+TABLE_BITS = 16
+
+
+class SearchLimitReached(Exception):
+    pass
+
+
+class ThreatBoard:
+    # Private copy of a Gomoku position the solver can play on without touching the game
+    def __init__(self, game):
+        self.size = game.size
+        self.lines = copy.deepcopy(game.lines)
+        self.zobrist = game.zobrist
+        self.board_hash = game.board_hash
+        self.stones = {}
+        # Stones of each color within two points of each cell. A four or open three needs at least one of our
+        # stones that close to the move, and a point that makes five needs at least two.
+        self.near = {color: [[0] * self.size for _ in range(self.size)] for color in self.lines.own}
+        for x in range(self.size):
+            for y in range(self.size):
+                if game.board[x][y].value != "EMPTY":
+                    self.stones[(x, y)] = game.board[x][y]
+                    self.mark_near((x, y), game.board[x][y], 1)
+        # best_shape per (cell, color); a stone only changes the shapes of cells on its four lines
+        self.shapes: dict[tuple[tuple[int, int], object], int] = {}
+
+    def mark_near(self, coord: tuple[int, int], color, amount: int):
+        x, y = coord
+        near = self.near[color]
+        for nx in range(max(0, x - 2), min(self.size, x + 3)):
+            for ny in range(max(0, y - 2), min(self.size, y + 3)):
+                near[nx][ny] += amount
+
+    def place(self, coord: tuple[int, int], color):
+        self.stones[coord] = color
+        self.lines.place(coord, color)
+        self.board_hash ^= self.zobrist[coord[0]][coord[1]][color]
+        self.mark_near(coord, color, 1)
+        self.forget(coord)
+
+    def remove(self, coord: tuple[int, int]):
+        color = self.stones.pop(coord)
+        self.lines.remove(coord, color)
+        self.board_hash ^= self.zobrist[coord[0]][coord[1]][color]
+        self.mark_near(coord, color, -1)
+        self.forget(coord)
+
+    def forget(self, coord: tuple[int, int]):
+        shapes = self.shapes
+        for cell in self.line_cells(coord, True):
+            for color in self.lines.own:
+                shapes.pop((cell, color), None)
+
+    def candidates(self, color, minimum: int = 1) -> list[tuple[int, int]]:
+        near = self.near[color]
+        return [(x, y) for x in range(self.size) for y in range(self.size) if near[x][y] >= minimum and (x, y) not in self.stones]
+
+    def best_shape(self, coord: tuple[int, int], color) -> int:
+        shape = self.shapes.get((coord, color))
+        if shape is None:
+            shape = self.shapes[(coord, color)] = self.lines.best_shape(coord, color)
+        return shape
+
+    def five_points(self, color, cells: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        return [cell for cell in cells if cell not in self.stones and self.best_shape(cell, color) == patterns.FIVE]
+
+    def line_cells(self, coord: tuple[int, int], occupied: bool = False) -> list[tuple[int, int]]:
+        # Cells within four points of coord along its four lines, empty ones only unless occupied is set
+        cells = [coord] if occupied else []
+        for dx, dy in patterns.DIRECTIONS:
+            for step in (-4, -3, -2, -1, 1, 2, 3, 4):
+                x, y = coord[0] + dx * step, coord[1] + dy * step
+                if 0 <= x < self.size and 0 <= y < self.size and (occupied or (x, y) not in self.stones):
+                    cells.append((x, y))
+        return cells
+
+
+class ThreatTable:
+    # Fixed number of slots indexed by the position hash; a new result replaces whatever held its slot, so the table
+    # stays the same size however many moves and games the searcher lives through
+    def __init__(self, bits: int = TABLE_BITS):
+        self.mask = (1 << bits) - 1
+        self.entries: list[tuple | None] = [None] * (1 << bits)
+
+    def probe(self, key: tuple[int, object, bool]) -> tuple[int, list | None] | None:
+        entry = self.entries[key[0] & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+        return None
+
+    def store(self, key: tuple[int, object, bool], depth: int, result: list | None):
+        self.entries[key[0] & self.mask] = (key, depth, result)
+
+
+class ThreatSearcher:
+    # Victory by continuous fours (VCF) and by continuous fours and threes (VCT). Only threat moves are searched:
+    # the defender is limited to blocks and counter-fours, and results are kept in a ThreatTable by position hash.
+    def __init__(self, time_limit: float = 1.0, node_limit: int = 3000, max_depth: int = 10):
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.table = ThreatTable()
+        self.nodes = 0
+        self.deadline = 0.0
+
+    def solve(self, game, color=None, vct: bool = True) -> list[tuple[int, int]] | None:
+        # Winning sequence (attacker and defender moves alternating) for color, or None if none was found
+        color = color or game.cur_player()
+        board = ThreatBoard(game)
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_limit
+        try:
+            sequence = self.attack(board, color, board.lines.opponent[color], vct, self.max_depth)
+        except SearchLimitReached:
+            sequence = None
+        logger.info(f"Gomoku threat search: {'VCT' if vct else 'VCF'} {'found' if sequence else 'not found'}, {self.nodes} nodes")
+        return sequence
+
+    def defend(self, game, color=None, vct: bool = True) -> tuple[int, int] | None:
+        # A move that refutes the opponent's forced win, the opponent's first threat if nothing refutes it in
+        # the budget, or None if the opponent has no forced win
+        color = color or game.cur_player()
+        board = ThreatBoard(game)
+        opponent = board.lines.opponent[color]
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_limit
+        try:
+            threat = self.attack(board, opponent, color, vct, self.max_depth)
+        except SearchLimitReached:
+            threat = None
+        if threat is None:
+            return None
+        # Points of the threat sequence and our own fours, most promising for either side first
+        candidates = list(dict.fromkeys(threat))
+        candidates += [cell for cell in board.candidates(color) if cell not in candidates and board.best_shape(cell, color) in FOUR_SHAPES]
+        candidates.sort(key=lambda cell: -max(board.best_shape(cell, color), board.best_shape(cell, opponent)))
+        defence = threat[0]
+        try:
+            for cell in candidates:
+                board.place(cell, color)
+                try:
+                    refuted = self.attack(board, opponent, color, vct, self.max_depth) is None
+                finally:
+                    board.remove(cell)
+                if refuted:
+                    defence = cell
+                    break
+        except SearchLimitReached:
+            pass
+        logger.info(f"Gomoku threat search: opponent {'VCT' if vct else 'VCF'} found, defending at {defence}, {self.nodes} nodes")
+        return defence
+
+    def attack(self, board: ThreatBoard, attacker, defender, vct: bool, depth: int) -> list[tuple[int, int]] | None:
+        self.nodes += 1
+        if self.nodes > self.node_limit or (self.nodes & 63 == 0 and time.perf_counter() > self.deadline):
+            raise SearchLimitReached
+        candidates = board.candidates(attacker)
+        shapes = [board.best_shape(cell, attacker) for cell in candidates]
+        for cell, shape in zip(candidates, shapes):
+            if shape == patterns.FIVE:
+                return [cell]
+        if depth <= 0:
+            return None
+        key = (board.board_hash, attacker, vct)
+        cached = self.table.probe(key)
+        if cached is not None and (cached[1] is not None or cached[0] >= depth):
+            return cached[1]
+
+        forced = board.five_points(defender, board.candidates(defender, 2))
+        if len(forced) > 1:
+            result = None
+        else:
+            result = None
+            # A defender four leaves only the block; otherwise try our fours before our threes
+            moves = list(zip(candidates, shapes))
+            if forced:
+                moves = [(cell, shape) for cell, shape in moves if cell == forced[0]]
+            for threes in (False, True) if vct else (False,):
+                for move, shape in moves:
+                    if shape not in (THREE_SHAPES if threes else FOUR_SHAPES):
+                        continue
+                    result = self.try_threat(board, attacker, defender, move, vct, depth)
+                    if result is not None:
+                        break
+                if result is not None:
+                    break
+        self.table.store(key, depth, result)
+        return result
+
+    def try_threat(self, board: ThreatBoard, attacker, defender, move: tuple[int, int], vct: bool, depth: int) -> list[tuple[int, int]] | None:
+        board.place(move, attacker)
+        try:
+            gains = board.five_points(attacker, board.line_cells(move))
+            if len(gains) >= 2:
+                return [move]  # open four or double four, one block cannot stop both
+            if gains:
+                defences = gains
+            else:
+                # An open three: every point that would stop the open four, plus the defender's own fours
+                defences = [cell for cell in board.line_cells(move) if board.best_shape(cell, attacker) in FOUR_SHAPES]
+                defences += [cell for cell in board.candidates(defender) if cell not in defences and board.best_shape(cell, defender) in FOUR_SHAPES]
+            if not defences:
+                return None
+            line = None
+            for defence in defences:
+                board.place(defence, defender)
+                try:
+                    # A block that makes five for the defender refutes the threat
+                    if board.best_shape(defence, defender) == patterns.FIVE:
+                        return None
+                    line = self.attack(board, attacker, defender, vct, depth - 1)
+                finally:
+                    board.remove(defence)
+                if line is None:
+                    return None
+                line = [defence] + line
+            return [move] + line if len(defences) == 1 else [move]
+        finally:
+            board.remove(move)
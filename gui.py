@@ -1,14 +1,14 @@
 from __future__ import annotations
 
-import copy
 import sys
-from time import sleep
 
 import pygame
 import pygame_gui
 from loguru import logger
 
+import game_format
 from account import AccountManager
+from ai_runner import AIMoveRunner
 from board import (
     BaseBoardGame,
     Color,
@@ -19,11 +19,12 @@ from board import (
     Level2AIPlayerStrategy,
     Level3AIPlayerStrategy,
     OthelloGame,
+    PlayerStrategy,
 )
+from renderer import BACKGROUND, BLACK, WHITE, BoardRenderer, font, text
+from replay import ReplayCursor
 
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-BACKGROUND = (175, 135, 0)
+LEADERBOARD_MIN_GAMES = 5  # games a player needs before appearing in the win rate ranking
 
 
 class Button:
@@ -35,8 +36,7 @@ class Button:
 
     def draw(self, screen):
         pygame.draw.rect(screen, WHITE, self.rect)
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        text_surface = font.render(self.text, True, BLACK)
+        text_surface = text(self.text, int(24 * self.ratio), BLACK)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -64,11 +64,23 @@ class BoardGameGUI:
         self.sidebar_width = sidebar_width
 
         self.init_pygame()
-        self.account_manager = AccountManager(account_file)
+        if getattr(self, "account_manager", None) is None:
+            self.account_manager = AccountManager(account_file)
+        else:
+            # Re-login keeps the manager, so its sessions let returning players skip the password hash
+            self.account_manager.login_state.clear()
+        if getattr(self, "ai_runner", None) is None:
+            self.ai_runner = AIMoveRunner()
+        else:
+            self.ai_runner.cancel()
         self.user1 = None
         self.user2 = None
         self.user1_login = False
         self.user2_login = False
+        self.replay_cursor: ReplayCursor | None = None
+        self.player_labels: dict[str, tuple[dict, str]] = {}  # username -> (record the label was made from, label)
+        self.leaderboard_lines: list[pygame.Surface] | None = None
+        self.time_delta = 0.0
         # Call the login method at the start
         self.login()
         if self.user1 == "AI":
@@ -94,6 +106,9 @@ class BoardGameGUI:
 
         user1_msg = None
         user2_msg = None
+        # (action, username, future) of the login or registration each side is waiting for
+        pending1 = None
+        pending2 = None
         while not self.user1_login or not self.user2_login:
             time_delta = self.clock.tick(60) / 1000.0
             for event in pygame.event.get():
@@ -102,81 +117,82 @@ class BoardGameGUI:
                     pygame.quit()
                     sys.exit()
                 elif event.type == pygame_gui.UI_BUTTON_PRESSED:
-                    if event.ui_element == self.login_button1:
-                        # Validate login credentials
+                    if event.ui_element == self.login_button1 and pending1 is None:
+                        # Validate login credentials on a worker thread; the result is picked up below
                         username = self.username_input1.get_text()
                         password = self.password_input1.get_text()
-                        if self.account_manager.login(username, password):
-                            self.user1_login = True
-                            self.user1 = username
-                            user1_msg = "Login successful"
-                        else:
-                            user1_msg = "Invalid username or password!"
-                            logger.warning(user1_msg)  # Replace with a proper on-screen message
-                    elif event.ui_element == self.login_button2:
-                        # Validate login credentials
+                        pending1 = ("Login", username, self.account_manager.login_async(username, password))
+                        user1_msg = "Checking..."
+                    elif event.ui_element == self.login_button2 and pending2 is None:
+                        # Validate login credentials on a worker thread; the result is picked up below
                         username = self.username_input2.get_text()
                         password = self.password_input2.get_text()
-                        if self.account_manager.login(username, password):
-                            self.user2_login = True
-                            self.user2 = username
-                            user2_msg = "Login successful"
-                        else:
-                            user2_msg = "Invalid username or password!"
-                            logger.warning(user2_msg)  # Replace with a proper on-screen message
-                    elif event.ui_element == self.register_button1:
+                        pending2 = ("Login", username, self.account_manager.login_async(username, password))
+                        user2_msg = "Checking..."
+                    elif event.ui_element == self.register_button1 and pending1 is None:
                         username = self.username_input1.get_text()
                         password = self.password_input1.get_text()
-                        if self.account_manager.register(username, password):
-                            user1_msg = "Register successful"
-                            logger.info(user2_msg)
-                            self.user1_login = True
-                            self.user1 = username
-                        else:
-                            user1_msg = "Username already exists"
-                            logger.warning(user1_msg)
-                    elif event.ui_element == self.register_button2:
+                        pending1 = ("Register", username, self.account_manager.register_async(username, password))
+                        user1_msg = "Registering..."
+                    elif event.ui_element == self.register_button2 and pending2 is None:
                         username = self.username_input2.get_text()
                         password = self.password_input2.get_text()
-                        if self.account_manager.register(username, password):
-                            user2_msg = "Register successful"
-                            logger.info(user2_msg)
-                            self.user2_login = True
-                            self.user2 = username
-                        else:
-                            user2_msg = "Username already exists"
-                            logger.warning(user2_msg)
+                        pending2 = ("Register", username, self.account_manager.register_async(username, password))
+                        user2_msg = "Registering..."
                     elif event.ui_element == self.ai_button1:
                         self.user1_login = True
                         self.user1 = "AI"
+                        pending1 = None  # a login still being checked no longer matters
                         user1_msg = "Login successful"
                     elif event.ui_element == self.ai_button2:
                         self.user2_login = True
                         self.user2 = "AI"
+                        pending2 = None  # a login still being checked no longer matters
                         user2_msg = "Login successful"
                     elif event.ui_element == self.visitor_button1:
                         self.user1_login = True
                         self.user1 = "Visitor"
+                        pending1 = None  # a login still being checked no longer matters
                         user1_msg = "Login successful"
                     elif event.ui_element == self.visitor_button2:
                         self.user2_login = True
                         self.user2 = "Visitor"
+                        pending2 = None  # a login still being checked no longer matters
                         user2_msg = "Login successful"
 
+            if pending1 is not None and pending1[2].done():
+                action, username, future = pending1
+                pending1 = None
+                if future.result():
+                    self.user1_login = True
+                    self.user1 = username
+                    user1_msg = f"{action} successful"
+                else:
+                    user1_msg = "Invalid username or password!" if action == "Login" else "Username already exists"
+                    logger.warning(user1_msg)
+            if pending2 is not None and pending2[2].done():
+                action, username, future = pending2
+                pending2 = None
+                if future.result():
+                    self.user2_login = True
+                    self.user2 = username
+                    user2_msg = f"{action} successful"
+                else:
+                    user2_msg = "Invalid username or password!" if action == "Login" else "Username already exists"
+                    logger.warning(user2_msg)
+
             self.manager.update(time_delta)
             self.login_screen.fill(BACKGROUND)
             self.manager.draw_ui(self.login_screen)
 
             if user1_msg is not None:
-                font = pygame.font.SysFont(None, 20)
-                text = font.render(f"{user1_msg}", True, BLACK)
+                message = text(user1_msg, 20, BLACK)
                 # Draw on the sidebar, not on the board
-                self.login_screen.blit(text, pygame.Rect((50, 20), (200, 30)))
+                self.login_screen.blit(message, pygame.Rect((50, 20), (200, 30)))
             if user2_msg is not None:
-                font = pygame.font.SysFont(None, 20)
-                text = font.render(f"{user2_msg}", True, BLACK)
+                message = text(user2_msg, 20, BLACK)
                 # Draw on the sidebar, not on the board
-                self.login_screen.blit(text, pygame.Rect((350, 20), (200, 30)))
+                self.login_screen.blit(message, pygame.Rect((350, 20), (200, 30)))
 
             pygame.display.flip()
 
@@ -193,83 +209,53 @@ class BoardGameGUI:
         self.clock = pygame.time.Clock()
         self.manager = pygame_gui.UIManager((self.window_width, self.window_height))
         self.activate_dialog = False
-
-    def draw_current_game(self):
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        text = font.render(f"{self.game.name}", True, BLACK)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(20 * self.ratio)))
-
-    def draw_current_player(self):
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        if self.game.cur_player() == Color.BLACK:
-            text = font.render("Current Player: Black (Player1)", True, BLACK)
-        else:
-            text = font.render("Current Player: White (Player2)", True, WHITE)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(50 * self.ratio)))
-
-    def draw_player_mode(self):
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        if self.user1 == "AI" or self.user1 == "Visitor":
-            role1 = self.game.player1_strategy.role
-        else:
-            record = self.account_manager.get_record(self.user1)
-            role1 = (
-                self.user1
+        # Buttons and the board background only change with the layout, so both are built here
+        self.create_buttons()
+        self.renderer = BoardRenderer(self.screen, self.grid_size, self.game.size, self.stone_radius, self.buttons)
+
+    def shown_game(self) -> BaseBoardGame:
+        # The replayed position while a playback is open, the live game otherwise
+        return self.replay_cursor.game if self.replay_cursor is not None else self.game
+
+    def player_label(self, user: str, strategy) -> str:
+        # Rebuilt only when the account manager hands out a new record, i.e. after a result was recorded
+        if user == "AI" or user == "Visitor":
+            return strategy.role
+        record = self.account_manager.get_record(user)
+        label = self.player_labels.get(user)
+        if label is None or label[0] is not record:
+            text = (
+                user
                 + f"({record['go_wins']}/{record['go_games_played']}, {record['gomoku_wins']}/{record['gomoku_games_played']}, {record['othello_wins']}/{record['othello_games_played']})"
             )
-        text = font.render(f"Player1 Mode: {role1}", True, BLACK)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(80 * self.ratio)))
-
-        if self.user2 == "AI" or self.user2 == "Visitor":
-            role2 = self.game.player2_strategy.role
+            label = (record, text)
+            self.player_labels[user] = label
+        return label[1]
+
+    def sidebar_fields(self) -> dict[tuple[int, int], tuple[str, int, tuple[int, int, int]]]:
+        # Sidebar text by position, as (text, font size, colour); the renderer repaints only the fields that changed
+        x = int(self.window_width - self.sidebar_width + int(5 * self.ratio))
+        size = int(24 * self.ratio)
+        if self.shown_game().cur_player() == Color.BLACK:
+            player = ("Current Player: Black (Player1)", size, BLACK)
         else:
-            record = self.account_manager.get_record(self.user2)
-            role2 = (
-                self.user2
-                + f"({record['go_wins']}/{record['go_games_played']}, {record['gomoku_wins']}/{record['gomoku_games_played']}, {record['othello_wins']}/{record['othello_games_played']})"
-            )
-        text = font.render(f"Player2 Mode: {role2}", True, WHITE)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(110 * self.ratio)))
-
-    def draw_round(self):
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        text = font.render(f"Current Round: {self.game.round}", True, BLACK)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(140 * self.ratio)))
-
-    def draw_winner(self):
-        font = pygame.font.SysFont(None, int(24 * self.ratio))
-        text = font.render(f"Winner: {self.game.winner}", True, BLACK)
-        # Draw on the sidebar, not on the board
-        self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(170 * self.ratio)))
+            player = ("Current Player: White (Player2)", size, WHITE)
+        if self.replay_cursor is not None:
+            state = "Playing" if self.replay_cursor.playing else "Paused"
+            progress = f"Replay: {self.replay_cursor.ply}/{len(self.replay_cursor)} {state} x{self.replay_cursor.speed:g}/s"
+        else:
+            progress = f"Current Round: {self.game.round}" + (" (AI thinking)" if self.ai_runner.thinking else "")
+        fields = {
+            (x, int(20 * self.ratio)): (self.game.name, size, BLACK),
+            (x, int(50 * self.ratio)): player,
+            (x, int(80 * self.ratio)): (f"Player1 Mode: {self.player_label(self.user1, self.game.player1_strategy)}", size, BLACK),
+            (x, int(110 * self.ratio)): (f"Player2 Mode: {self.player_label(self.user2, self.game.player2_strategy)}", size, WHITE),
+            (x, int(140 * self.ratio)): (progress, size, BLACK),
+            (x, int(170 * self.ratio)): (f"Winner: {self.game.winner}", size, BLACK),
+        }
         if getattr(self.game, "final_score", "") != "":
-            text = font.render(f"Score: {self.game.final_score}", True, BLACK)
-            self.screen.blit(text, (self.window_width - self.sidebar_width + int(5 * self.ratio), int(200 * self.ratio)))
-
-    def draw_board(self):
-        self.screen.fill(BACKGROUND)
-        for row in range(self.game.size):
-            for col in range(self.game.size):
-                pygame.draw.rect(
-                    self.screen,
-                    BLACK,
-                    (self.grid_size + col * self.grid_size - 1, self.grid_size + row * self.grid_size - 1, 2, 2),
-                )
-                if self.game.board[row][col] in (Color.BLACK, Color.WHITE):
-                    if self.game.board[row][col] == Color.BLACK:
-                        draw_color = BLACK
-                    else:
-                        draw_color = WHITE
-                    pygame.draw.circle(
-                        self.screen,
-                        draw_color,
-                        (self.grid_size + col * self.grid_size, self.grid_size + row * self.grid_size),
-                        self.stone_radius,
-                    )
+            fields[(x, int(200 * self.ratio))] = (f"Score: {self.game.final_score}", size, BLACK)
+        return fields
 
     def create_buttons(self):
         # Create buttons in the sidebar
@@ -287,12 +273,21 @@ class BoardGameGUI:
             Button(
                 sidebar_x - int(30 * self.ratio),
                 self.window_height - int(520 * self.ratio),
-                int(252 * self.ratio),
+                int(122 * self.ratio),
                 int(30 * self.ratio),
                 self.ratio,
                 "Playback",
                 self.playback,
             ),
+            Button(
+                sidebar_x + int(130 * self.ratio) - int(30 * self.ratio),
+                self.window_height - int(520 * self.ratio),
+                int(122 * self.ratio),
+                int(30 * self.ratio),
+                self.ratio,
+                "Leaderboard",
+                self.toggle_leaderboard,
+            ),
             Button(
                 sidebar_x - int(30 * self.ratio),
                 self.window_height - int(480 * self.ratio),
@@ -485,12 +480,65 @@ class BoardGameGUI:
         ]
 
     def playback(self):
-        replay_back = copy.deepcopy(self.game.replay)
-        self.game.__init__(self.size, self.game.player1_strategy, self.game.player2_strategy)
-        for move in replay_back:
-            sleep(0.5)
-            self.update_gui()
-            self.game.move(move)
+        # Opens a replay of the current game from the first move, or closes the open one; the live game is untouched
+        if self.replay_cursor is not None:
+            self.stop_playback()
+            return
+        self.replay_cursor = ReplayCursor(self.game)
+        self.replay_cursor.seek(0)
+        self.replay_cursor.play()
+
+    def stop_playback(self):
+        self.replay_cursor = None
+
+    def handle_replay_key(self, key) -> bool:
+        # Left/right step, home/end jump, space plays or pauses, up/down change the speed, escape closes the replay
+        cursor = self.replay_cursor
+        if key == pygame.K_LEFT:
+            cursor.pause()
+            cursor.step_back()
+        elif key == pygame.K_RIGHT:
+            cursor.pause()
+            cursor.step_forward()
+        elif key == pygame.K_HOME:
+            cursor.seek(0)
+        elif key == pygame.K_END:
+            cursor.seek(len(cursor))
+        elif key == pygame.K_SPACE:
+            if cursor.playing:
+                cursor.pause()
+            else:
+                cursor.play()
+        elif key == pygame.K_UP:
+            cursor.change_speed(1)
+        elif key == pygame.K_DOWN:
+            cursor.change_speed(-1)
+        elif key == pygame.K_ESCAPE:
+            self.stop_playback()
+        else:
+            return False
+        return True
+
+    def toggle_leaderboard(self):
+        if self.leaderboard_lines is None:
+            self.leaderboard_lines = self.render_leaderboard()
+        else:
+            self.leaderboard_lines = None
+
+    def render_leaderboard(self) -> list[pygame.Surface]:
+        # The leaderboard of the current game, rendered once when opened and again when a result is recorded
+        game = self.game.name.split(" ")[0].lower()
+        lines = [f"{self.game.name} - most wins"]
+        for place, (username, wins, played) in enumerate(self.account_manager.leaderboard(game, "wins", 10), 1):
+            lines.append(f"{place}. {username}  {wins}/{played}")
+        lines.append(f"Best win rate ({LEADERBOARD_MIN_GAMES}+ games)")
+        for place, (username, wins, played) in enumerate(self.account_manager.leaderboard(game, "rate", 5, LEADERBOARD_MIN_GAMES), 1):
+            lines.append(f"{place}. {username}  {100 * wins // played}%")
+        for user in (self.user1, self.user2):
+            if user != "AI" and user != "Visitor":
+                place = self.account_manager.rank(user, game)
+                lines.append(f"{user}: " + (f"#{place} by wins" if place is not None else "no games yet"))
+        return [font(int(24 * self.ratio)).render(line, True, WHITE) for line in lines]
 
     def open_save_dialog(self):
         # Create a file dialog to save the file
@@ -498,7 +546,7 @@ class BoardGameGUI:
             rect=pygame.Rect((100, 100), (400, 500)),
             manager=self.manager,
             window_title="Save Game State",
-            initial_file_path="game_state.pickle",
+            initial_file_path="game_state.game",
             allow_existing_files_only=False,
         )
         self.activate_dialog = True
@@ -509,33 +557,38 @@ class BoardGameGUI:
             rect=pygame.Rect((100, 100), (400, 500)),
             manager=self.manager,
             window_title="Load Game State",
-            initial_file_path="game_state.pickle",
+            initial_file_path="game_state.game",
             allow_existing_files_only=True,
         )
         self.activate_dialog = True
 
-    def draw_buttons(self):
-        # Draw buttons in the sidebar
-        for button in self.buttons:
-            button.draw(self.screen)
-
     def init_go_game(self):
+        self.ai_runner.cancel()
+        self.stop_playback()
+        self.leaderboard_lines = None
         self.cur_game_type = self.game_list[0]
         self.game = self.cur_game_type(self.size, self.game.player1_strategy, self.game.player2_strategy)
         self.init_pygame()
 
     def init_gomoku_game(self):
+        self.ai_runner.cancel()
+        self.stop_playback()
+        self.leaderboard_lines = None
         self.cur_game_type = self.game_list[1]
         self.game = self.cur_game_type(self.size, self.game.player1_strategy, self.game.player2_strategy)
         self.init_pygame()
 
     def init_othello_game(self):
+        self.ai_runner.cancel()
+        self.stop_playback()
+        self.leaderboard_lines = None
         self.cur_game_type = self.game_list[2]
         self.game = self.cur_game_type(self.size, self.game.player1_strategy, self.game.player2_strategy)
         self.init_pygame()
         self.eight_way()
 
     def eight_way(self):
+        self.ai_runner.cancel()
         self.size = 8
         self.ratio = 1.0 * self.size / 19
         self.sidebar_width = self.orig_sidebar_width * self.ratio
@@ -543,6 +596,7 @@ class BoardGameGUI:
         self.init_pygame()
 
     def nine_way(self):
+        self.ai_runner.cancel()
         self.size = 9
         self.ratio = 1.0 * self.size / 19
         self.sidebar_width = self.orig_sidebar_width * self.ratio
@@ -550,6 +604,7 @@ class BoardGameGUI:
         self.init_pygame()
 
     def thirteen_way(self):
+        self.ai_runner.cancel()
         self.size = 13
         self.ratio = 1.0 * self.size / 19
         self.sidebar_width = self.orig_sidebar_width * self.ratio
@@ -557,62 +612,85 @@ class BoardGameGUI:
         self.init_pygame()
 
     def nineteen_way(self):
+        self.ai_runner.cancel()
         self.size = 19
         self.ratio = 1.0 * self.size / 19
         self.sidebar_width = self.orig_sidebar_width * self.ratio
         self.game = self.cur_game_type(self.size, self.game.player1_strategy, self.game.player2_strategy)
         self.init_pygame()
 
+    def set_strategy(self, player: str, strategy: PlayerStrategy):
+        # The replaced strategy may still be searching on the AI thread, and a Level3 one may own worker processes
+        self.ai_runner.cancel()
+        getattr(self.game, player).close()
+        setattr(self.game, player, strategy)
+
     def play1_human(self):
         if self.user1 != "AI":
-            self.game.player1_strategy = HumanPlayerStrategy(Color.BLACK)
+            self.set_strategy("player1_strategy", HumanPlayerStrategy(Color.BLACK))
 
     def play1_level1_ai(self):
         if self.user1 == "AI":
-            self.game.player1_strategy = Level1AIPlayerStrategy(Color.BLACK)
+            self.set_strategy("player1_strategy", Level1AIPlayerStrategy(Color.BLACK))
 
     def play1_level2_ai(self):
         if self.user1 == "AI":
-            self.game.player1_strategy = Level2AIPlayerStrategy(Color.BLACK)
+            self.set_strategy("player1_strategy", Level2AIPlayerStrategy(Color.BLACK))
 
     def play1_level3_ai(self):
         if self.user1 == "AI":
-            self.game.player1_strategy = Level3AIPlayerStrategy(Color.BLACK)
+            self.set_strategy("player1_strategy", Level3AIPlayerStrategy(Color.BLACK))
 
     def play2_human(self):
         if self.user2 != "AI":
-            self.game.player2_strategy = HumanPlayerStrategy(Color.WHITE)
+            self.set_strategy("player2_strategy", HumanPlayerStrategy(Color.WHITE))
 
     def play2_level1_ai(self):
         if self.user2 == "AI":
-            self.game.player2_strategy = Level1AIPlayerStrategy(Color.WHITE)
+            self.set_strategy("player2_strategy", Level1AIPlayerStrategy(Color.WHITE))
 
     def play2_level2_ai(self):
         if self.user2 == "AI":
-            self.game.player2_strategy = Level2AIPlayerStrategy(Color.WHITE)
+            self.set_strategy("player2_strategy", Level2AIPlayerStrategy(Color.WHITE))
 
     def play2_level3_ai(self):
         if self.user2 == "AI":
-            self.game.player2_strategy = Level3AIPlayerStrategy(Color.WHITE)
+            self.set_strategy("player2_strategy", Level3AIPlayerStrategy(Color.WHITE))
 
     def surrender(self):
         self.game.surrender()
 
     def undo_move(self):
+        self.ai_runner.cancel()
+        self.stop_playback()
         self.game.regret()
 
     def restart_game(self):
+        self.ai_runner.cancel()
+        self.stop_playback()
         self.game.restart()
         self.update_record = False
 
     def pass_turn(self):
+        # Only a human passes, and never while the AI is thinking: its move would be dropped or land after the pass
+        if self.ai_runner.thinking or self.game.cur_player_strategy().role != "Human":
+            return
         self.game.move(None)
 
     def save_game_state(self, filename):
-        self.game.save_to_file(filename, self.user1, self.user2)
+        try:
+            self.game.save_to_file(filename, self.user1, self.user2)
+        except OSError as e:
+            logger.warning(f"Game not saved: {e}")
 
     def load_game_state(self, filename):
-        self.game.load_from_file(filename, self.user1, self.user2)
+        self.ai_runner.cancel()
+        self.stop_playback()
+        try:
+            self.game.load_from_file(filename, self.user1, self.user2)
+        except (game_format.GameFormatError, OSError) as e:
+            # Old pickled saves end up here too; the game on the board is left as it was
+            logger.warning(f"Game not loaded from {filename}: {e}")
 
     def handle_mouse_click(self, pos: tuple(float, float)):
         x, y = pos
@@ -625,17 +703,17 @@ class BoardGameGUI:
         return False
 
     def update_gui(self):
-        self.create_buttons()
-        self.draw_board()
-        self.draw_current_game()
-        self.draw_current_player()
-        self.draw_player_mode()
-        self.draw_round()
-        self.draw_winner()
-        self.draw_buttons()
-        self.manager.update(self.clock.tick(60) / 1000.0)
-        self.manager.draw_ui(self.screen)  # Draw the UI
-        pygame.display.flip()
+        # One frame: waits for the next 60 fps tick, then sends only what changed to the display
+        self.time_delta = self.clock.tick(60) / 1000.0
+        self.manager.update(self.time_delta)
+        dirty = self.renderer.draw(self.shown_game().board, self.sidebar_fields(), self.leaderboard_lines)
+        if self.activate_dialog:
+            # pygame_gui windows are drawn over a full frame, and the frame after they close repaints everything
+            self.manager.draw_ui(self.screen)
+            pygame.display.flip()
+            self.renderer.invalidate()
+        elif dirty:
+            pygame.display.update(dirty)
 
     def start_game(self):
         running = True
@@ -671,7 +749,7 @@ class BoardGameGUI:
                         for button in self.buttons:
                             if button.handle_event(event):
                                 is_handle = True
-                        if not is_handle:
+                        if not is_handle and self.replay_cursor is None:
                             pos = pygame.mouse.get_pos()
                             if self.game.cur_player_strategy().role == "Human":
                                 if self.handle_mouse_click(pos):
@@ -679,7 +757,9 @@ class BoardGameGUI:
                 elif event.type == pygame.KEYDOWN:
                     if self.activate_dialog:
                         continue
-                    if event.key == pygame.K_u:
+                    if self.replay_cursor is not None and self.handle_replay_key(event.key):
+                        pass
+                    elif event.key == pygame.K_u:
                         self.undo_move()
                     elif event.key == pygame.K_r:
                         self.restart_game()
@@ -689,27 +769,46 @@ class BoardGameGUI:
                         self.open_save_dialog()
                     elif event.key == pygame.K_l:
                         self.open_load_dialog()
+                    elif event.key == pygame.K_b:
+                        self.toggle_leaderboard()
                     elif event.key == pygame.K_q:
                         running = False
                     elif event.key == pygame.K_t:
                         block = True
                     elif event.key == pygame.K_c:
                         block = False
-                self.update_gui()
 
+            if self.replay_cursor is not None:
+                # The live game waits while a replay is open; playback advances by the time the last frame took
+                playing = self.replay_cursor.playing
+                self.replay_cursor.tick(self.time_delta)
+                if playing and not self.replay_cursor.playing:
+                    self.stop_playback()
+                self.update_gui()
+                continue
             if block:
+                self.update_gui()
                 continue
             if self.game.game_over and not self.update_record:
                 self.update_record = True
+                game = self.game.name.split(" ")[0].lower()
+                results = []
                 if self.user1 != "AI" and self.user1 != "Visitor":
-                    self.account_manager.update_record(self.user1, self.game.name.split(" ")[0].lower(), self.game.winner == "Black")
+                    results.append((self.user1, game, self.game.winner == "Black"))
                 if self.user2 != "AI" and self.user2 != "Visitor":
-                    self.account_manager.update_record(self.user2, self.game.name.split(" ")[0].lower(), self.game.winner == "White")
-            if "AI" in self.game.cur_player_strategy().role:
-                sleep(0.01)
-                self.game.play_round()
-                self.update_gui()
+                    results.append((self.user2, game, self.game.winner == "White"))
+                # Both players' results land in one transaction
+                self.account_manager.update_records(results)
+                if self.leaderboard_lines is not None:
+                    self.leaderboard_lines = self.render_leaderboard()
+            if "AI" in self.game.cur_player_strategy().role and not self.game.game_over:
+                # The AI thinks on a worker thread; its move is played here, on a later frame, once it is ready
+                self.ai_runner.update(self.game)
+            self.update_gui()
 
+        self.ai_runner.shutdown()
+        self.game.player1_strategy.close()
+        self.game.player2_strategy.close()
         pygame.quit()
         sys.exit()
 
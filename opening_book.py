@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import random
+import struct
+
+from loguru import logger
+
+# File layout: a header, then fixed-size records sorted by position key and, within a key, by falling weight
+MAGIC = b"BOOK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")  # magic, version, board size, record count
+RECORD = struct.Struct("<QBBI")  # position key, move x, move y, weight
+
+
+class OpeningBook:
+    # Read-only view of a book file; lookups binary-search the memory map, so the file is never loaded whole
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is empty, not an opening book")
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is too short for an opening book header")
+        magic, version, self.size, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or len(self.data) != HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self) -> OpeningBook:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def key_at(self, index: int) -> int:
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * RECORD.size)[0]
+
+    def moves(self, key: int) -> list[tuple[tuple[int, int], int]]:
+        # (move, weight) pairs stored for the position, heaviest first
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        while low < self.count:
+            record_key, x, y, weight = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+            if record_key != key:
+                break
+            moves.append(((x, y), weight))
+            low += 1
+        return moves
+
+    def choose(self, key: int, rng: random.Random | None = None) -> tuple[int, int] | None:
+        # A move picked in proportion to its weight, so the AI does not play the same line every game
+        moves = self.moves(key)
+        if not moves:
+            return None
+        return (rng or random).choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def write_book(path: str, size: int, weights: dict[tuple[int, tuple[int, int]], int]) -> int:
+    # weights maps (position key, move) to weight; returns the number of records written
+    records = sorted(((key, move, weight) for (key, move), weight in weights.items() if weight > 0), key=lambda record: (record[0], -record[2]))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, size, len(records)))
+        for key, (x, y), weight in records:
+            file.write(RECORD.pack(key, x, y, min(weight, 0xFFFFFFFF)))
+    return len(records)
+
+
+def build_from_games(game_cls: type, size: int, games, plies: int = 12, min_games: int = 2) -> dict[tuple[int, tuple[int, int]], int]:
+    # games yields (moves, winner) pairs. Each of the first plies moves is weighted 2 for a win of the player
+    # who made it and 1 for a tie; moves seen in fewer than min_games games are dropped as noise.
+    weights: dict[tuple[int, tuple[int, int]], int] = {}
+    seen: dict[tuple[int, tuple[int, int]], int] = {}
+    for moves, winner in games:
+        game = game_cls(size, None, None)
+        for move in moves[:plies]:
+            if move is None:
+                break  # passes only happen deep in a game; the book stops at the first one
+            move = tuple(move)
+            mover = game.cur_player().value.title()
+            entry = (game.position_key, move)
+            if not game.push(move):
+                break
+            seen[entry] = seen.get(entry, 0) + 1
+            weights[entry] = weights.get(entry, 0) + (2 if winner == mover else 1 if winner == "Tie" else 0)
+    return {entry: weight for entry, weight in weights.items() if seen[entry] >= min_games}
+
+
+def selfplay_games(paths: list[str], name: str, size: int):
+    # (moves, winner) of the finished games of one kind and size in selfplay.py JSONL output
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                record = json.loads(line)
+                if record["game"] == name and record["size"] == size and record["winner"] != "Unfinished":
+                    yield record["moves"], record["winner"]
+
+
+if __name__ == "__main__":
+    from board import GomokuGame, OthelloGame
+
+    games = {"gomoku": GomokuGame, "othello": OthelloGame}
+    parser = argparse.ArgumentParser(description="Build an opening book from self-play records")
+    parser.add_argument("game", choices=games)
+    parser.add_argument("records", nargs="+", help="selfplay.py .jsonl output")
+    parser.add_argument("--size", type=int, default=None)
+    parser.add_argument("--plies", type=int, default=12)
+    parser.add_argument("--min-games", type=int, default=2)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    logger.disable("board")
+    game_cls = games[args.game]
+    size = args.size or (8 if game_cls is OthelloGame else 15)
+    name = game_cls(size, None, None).name
+    weights = build_from_games(game_cls, size, selfplay_games(args.records, name, size), args.plies, args.min_games)
+    output = args.output or f"{args.game}.book"
+    logger.info(f"{write_book(output, size, weights)} book moves written to {output}")
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import time
+
+from loguru import logger
+
+import bitboard
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+WIN_SCORE = 10000  # per disc of final margin, so any decided game outranks a heuristic score
+INFINITY = 64 * WIN_SCORE + 1
+
+# Classic square weights; squares sharing a weight are scored together with one popcount
+SQUARE_WEIGHTS = [
+    [100, -20, 10, 5, 5, 10, -20, 100],
+    [-20, -50, -2, -2, -2, -2, -50, -20],
+    [10, -2, 1, 1, 1, 1, -2, 10],
+    [5, -2, 1, 0, 0, 1, -2, 5],
+    [5, -2, 1, 0, 0, 1, -2, 5],
+    [10, -2, 1, 1, 1, 1, -2, 10],
+    [-20, -50, -2, -2, -2, -2, -50, -20],
+    [100, -20, 10, 5, 5, 10, -20, 100],
+]
+MOBILITY_WEIGHT = 8
+
+# The endgame solver takes over at this many empty squares; below TABLE_EMPTIES it skips the hash table and
+# below SORT_EMPTIES it orders by parity alone, where sorting costs more than it saves
+ENDGAME_EMPTIES = 10
+TABLE_EMPTIES = 7
+SORT_EMPTIES = 6
+QUADRANTS = [0x0F0F0F0F, 0xF0F0F0F0, 0x0F0F0F0F << 32, 0xF0F0F0F0 << 32]
+
+
+def weight_masks() -> dict[int, int]:
+    masks: dict[int, int] = {}
+    for x in range(8):
+        for y in range(8):
+            if SQUARE_WEIGHTS[x][y] != 0:
+                masks[SQUARE_WEIGHTS[x][y]] = masks.get(SQUARE_WEIGHTS[x][y], 0) | 1 << bitboard.square((x, y))
+    return masks
+
+
+WEIGHT_MASKS = weight_masks()
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by the position hash. A slot is overwritten by the same position, by an entry
+    # from an older search, or by a search at least as deep; otherwise the deeper, current entry is kept.
+    def __init__(self, bits: int = 18):
+        self.mask = (1 << bits) - 1
+        self.entries: list[tuple | None] = [None] * (1 << bits)
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, own: int, opp: int) -> tuple | None:
+        entry = self.entries[hash((own, opp)) & self.mask]
+        if entry is not None and entry[0] == own and entry[1] == opp:
+            return entry
+        return None
+
+    def store(self, own: int, opp: int, depth: int, score: int, flag: int, move: int):
+        index = hash((own, opp)) & self.mask
+        entry = self.entries[index]
+        if entry is None or (entry[0] == own and entry[1] == opp) or entry[6] != self.generation or depth >= entry[2]:
+            self.entries[index] = (own, opp, depth, score, flag, move, self.generation)
+
+
+def evaluate(own: int, opp: int) -> int:
+    score = 0
+    for weight, mask in WEIGHT_MASKS.items():
+        score += weight * ((own & mask).bit_count() - (opp & mask).bit_count())
+    return score + MOBILITY_WEIGHT * (bitboard.legal_moves(own, opp).bit_count() - bitboard.legal_moves(opp, own).bit_count())
+
+
+def final_score(own: int, opp: int) -> int:
+    return WIN_SCORE * (own.bit_count() - opp.bit_count())
+
+
+class EndgameSolver:
+    # Exact disc difference with best play to the end of the game. Moves into quadrants with an odd number of
+    # empties go first (parity); with more empties left, moves that leave the opponent fewest replies go first.
+    def __init__(self, time_limit: float = 1.0, table_bits: int = 16):
+        self.time_limit = time_limit
+        self.table = TranspositionTable(table_bits)
+        self.nodes = 0
+        self.deadline = 0.0
+
+    def solve(self, own: int, opp: int, deadline: float | None = None, root_moves: int | None = None) -> tuple[int | None, int]:
+        # (best square or None if we must pass, final own minus opponent discs); raises SearchTimeout.
+        # root_moves limits the choice to some of the legal moves, as in OthelloSearcher.search.
+        self.deadline = deadline if deadline is not None else time.perf_counter() + self.time_limit
+        self.table.new_search()
+        self.nodes = 0
+        moves = bitboard.legal_moves(own, opp)
+        if moves == 0:
+            return None, self.negamax(own, opp, -65, 65)
+        if root_moves is not None:
+            moves &= root_moves
+        alpha = -65
+        best_move = None
+        for sq, flipped in self.order(own, opp, moves):
+            child_own, child_opp = opp & ~flipped, own | flipped | 1 << sq
+            if best_move is None:
+                score = -self.negamax(child_own, child_opp, -65, 65)
+            else:
+                score = -self.negamax(child_own, child_opp, -alpha - 1, -alpha)
+                if score > alpha:
+                    score = -self.negamax(child_own, child_opp, -65, -score)
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = sq
+        return best_move, alpha
+
+    def order(self, own: int, opp: int, moves: int) -> list[tuple[int, int]]:
+        # (square, flipped discs) pairs, best first
+        empty = ~(own | opp) & bitboard.FULL
+        odd = 0
+        for quadrant in QUADRANTS:
+            if (empty & quadrant).bit_count() & 1:
+                odd |= quadrant
+        if empty.bit_count() <= SORT_EMPTIES:
+            return [(sq, bitboard.flips(own, opp, sq)) for sq in bitboard.squares(moves & odd)] + [
+                (sq, bitboard.flips(own, opp, sq)) for sq in bitboard.squares(moves & ~odd)
+            ]
+        keyed = []
+        for sq in bitboard.squares(moves):
+            flipped = bitboard.flips(own, opp, sq)
+            replies = bitboard.legal_moves(opp & ~flipped, own | flipped | 1 << sq).bit_count()
+            keyed.append((replies * 2 + (0 if odd >> sq & 1 else 1), sq, flipped))
+        keyed.sort()
+        return [(sq, flipped) for _, sq, flipped in keyed]
+
+    def negamax(self, own: int, opp: int, alpha: int, beta: int, passed: bool = False) -> int:
+        self.nodes += 1
+        if self.nodes & 4095 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        moves = bitboard.legal_moves(own, opp)
+        if moves == 0:
+            if passed:
+                return own.bit_count() - opp.bit_count()
+            return -self.negamax(opp, own, -beta, -alpha, True)
+
+        empties = 64 - (own | opp).bit_count()
+        if empties == 1:
+            flipped = bitboard.flips(own, opp, moves.bit_length() - 1)
+            return own.bit_count() + 2 * flipped.bit_count() + 1 - opp.bit_count()
+        alpha_orig = alpha
+        tt_move = None
+        if empties >= TABLE_EMPTIES:
+            entry = self.table.probe(own, opp)
+            if entry is not None:
+                tt_move = entry[5]
+                if entry[4] == EXACT:
+                    return entry[3]
+                if entry[4] == LOWER:
+                    alpha = max(alpha, entry[3])
+                else:
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3]
+
+        ordered = self.order(own, opp, moves)
+        if tt_move is not None and moves >> tt_move & 1:
+            ordered.sort(key=lambda move: move[0] != tt_move)
+        # Principal variation search: the first move gets the full window, the rest only have to be proven worse
+        best_score = -65
+        best_move = ordered[0][0]
+        for index, (sq, flipped) in enumerate(ordered):
+            child_own, child_opp = opp & ~flipped, own | flipped | 1 << sq
+            if index == 0:
+                score = -self.negamax(child_own, child_opp, -beta, -alpha)
+            else:
+                score = -self.negamax(child_own, child_opp, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    score = -self.negamax(child_own, child_opp, -beta, -score)
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if empties >= TABLE_EMPTIES:
+            flag = UPPER if best_score <= alpha_orig else LOWER if best_score >= beta else EXACT
+            self.table.store(own, opp, empties, best_score, flag, best_move)
+        return best_score
+
+
+class OthelloSearcher:
+    # Negamax alpha-beta with iterative deepening inside a per-move time budget, and the exact endgame solver
+    # once few enough squares are empty
+    def __init__(self, time_limit: float = 1.0, max_depth: int = 60, table_bits: int = 18, endgame_empties: int = ENDGAME_EMPTIES):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.endgame_empties = endgame_empties
+        self.table = TranspositionTable(table_bits)
+        self.endgame = EndgameSolver(time_limit)
+        self.nodes = 0
+        self.depth = 0
+        self.nps = 0.0
+        self.score = 0
+        self.scores: list[tuple[int, int]] = []  # (score, move) of every completed depth of the last search
+        self.exact = False  # whether deeper search cannot change the last score: endgame solved or tree resolved
+        self.deadline = 0.0
+
+    def search(self, own: int, opp: int, root_moves: int | None = None) -> int | None:
+        # root_moves optionally limits the root to a subset of the legal moves, for splitting it between processes
+        moves = bitboard.legal_moves(own, opp)
+        if root_moves is not None:
+            moves &= root_moves
+        if moves == 0:
+            return None
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.table.new_search()
+        self.nodes = 0
+        self.depth = 0
+        self.scores = []
+        self.exact = False
+        empties = 64 - (own | opp).bit_count()
+        if empties <= self.endgame_empties:
+            try:
+                # Half the budget, so a position that is too hard still leaves time for the normal search
+                best_move, discs = self.endgame.solve(own, opp, start + self.time_limit / 2, root_moves)
+                self.score, self.depth, self.nodes = WIN_SCORE * discs, empties, self.endgame.nodes
+                self.scores = [(self.score, best_move)]
+                self.exact = True
+                logger.info(f"Othello endgame solved: {discs:+d} discs, {self.nodes} nodes in {time.perf_counter() - start:.2f}s")
+                return best_move
+            except SearchTimeout:
+                logger.info(f"Othello endgame not solved in time with {empties} empties, searching instead")
+        best_move = self.order_moves(own, opp, moves, None)[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.search_root(own, opp, moves, depth, best_move)
+            except SearchTimeout:
+                break
+            best_move, self.score, self.depth = move, score, depth
+            self.scores.append((score, move))
+            if abs(score) >= WIN_SCORE or depth >= 64 - (own | opp).bit_count():
+                self.exact = True
+                break  # the game tree is fully resolved
+        elapsed = time.perf_counter() - start
+        self.nps = self.nodes / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Othello search: depth {self.depth}, score {self.score}, {self.nodes} nodes, {self.nps:.0f} nodes/s")
+        return best_move
+
+    def search_root(self, own: int, opp: int, moves: int, depth: int, first: int) -> tuple[int, int]:
+        alpha = -INFINITY
+        best_move = first
+        for sq in self.order_moves(own, opp, moves, first):
+            flipped = bitboard.flips(own, opp, sq)
+            score = -self.negamax(opp & ~flipped, own | flipped | 1 << sq, depth - 1, -INFINITY, -alpha)
+            if score > alpha:
+                alpha = score
+                best_move = sq
+        if moves == bitboard.legal_moves(own, opp):
+            self.table.store(own, opp, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def negamax(self, own: int, opp: int, depth: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        moves = bitboard.legal_moves(own, opp)
+        if moves == 0:
+            if bitboard.legal_moves(opp, own) == 0:
+                return final_score(own, opp)
+            return -self.negamax(opp, own, depth, -beta, -alpha)
+        if depth == 0:
+            return evaluate(own, opp)
+
+        alpha_orig = alpha
+        tt_move = None
+        entry = self.table.probe(own, opp)
+        if entry is not None:
+            tt_move = entry[5]
+            if entry[2] >= depth:
+                if entry[4] == EXACT:
+                    return entry[3]
+                if entry[4] == LOWER:
+                    alpha = max(alpha, entry[3])
+                else:
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3]
+
+        best_score = -INFINITY
+        best_move = None
+        for sq in self.order_moves(own, opp, moves, tt_move):
+            flipped = bitboard.flips(own, opp, sq)
+            score = -self.negamax(opp & ~flipped, own | flipped | 1 << sq, depth - 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        flag = UPPER if best_score <= alpha_orig else LOWER if best_score >= beta else EXACT
+        self.table.store(own, opp, depth, best_score, flag, best_move)
+        return best_score
+
+    def order_moves(self, own: int, opp: int, moves: int, first: int | None) -> list[int]:
+        # Hash move first, then by square weight
+        ordered = sorted(bitboard.squares(moves), key=lambda sq: -SQUARE_WEIGHTS[sq >> 3][sq & 7])
+        if first is not None and moves >> first & 1:
+            ordered.remove(first)
+            ordered.insert(0, first)
+        return ordered
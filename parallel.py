@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from loguru import logger
+
+import bitboard
+from go_mcts import GoMCTS
+from othello_search import SQUARE_WEIGHTS, OthelloSearcher
+
+# Extra time the parent waits past the deadline for results already on their way back
+GRACE = 0.2
+
+# One engine per worker process, so tables and trees carry over between the moves that process searches
+_go_engine: GoMCTS | None = None
+_othello_searcher: OthelloSearcher | None = None
+
+
+def init_worker():
+    logger.disable("go_mcts")
+    logger.disable("othello_search")
+
+
+def remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.time())
+
+
+def go_worker(game_cls: type, size: int, memento, deadline: float, playouts: int | None, seed: int) -> list:
+    # One independent MCTS tree; the game is rebuilt from its memento in this process
+    global _go_engine
+    random.seed(seed)
+    game = game_cls(size, None, None)
+    game.restore_from_memento(memento)
+    if _go_engine is None:
+        _go_engine = GoMCTS()
+    _go_engine.time_limit = remaining(deadline)
+    _go_engine.playouts = playouts
+    return _go_engine.search(game)
+
+
+def othello_worker(own: int, opp: int, root_moves: int, deadline: float) -> tuple[list[tuple[int, int]], bool, int]:
+    # (score, best move) of this worker's share of the root moves at every depth it completed, whether its last
+    # score is exact, and its node count
+    global _othello_searcher
+    if _othello_searcher is None:
+        _othello_searcher = OthelloSearcher()
+    _othello_searcher.time_limit = remaining(deadline)
+    _othello_searcher.search(own, opp, root_moves)
+    return _othello_searcher.scores, _othello_searcher.exact, _othello_searcher.nodes
+
+
+def merge_depths(results: list[tuple[list[tuple[int, int]], bool, int]]) -> tuple[list[tuple[int, int]], int]:
+    # The best (score, move) of every share, compared at the deepest depth all shares completed: a share that got
+    # further has searched its moves with a longer horizon, and its score is not comparable to a shallower one.
+    # Exact scores hold at any depth and do not limit it.
+    depths = [len(scores) for scores, exact, _ in results if scores and not exact]
+    depth = min(depths, default=0)
+    best = []
+    for scores, exact, _ in results:
+        if not scores:
+            continue
+        best.append(scores[-1] if exact else scores[depth - 1])
+    return best, depth
+
+
+class ParallelSearch:
+    # Root parallelism over a process pool: independent MCTS trees for Go, a split of the root moves for Othello.
+    # Every worker stops at the same wall-clock deadline and the parent merges whatever came back by then.
+    def __init__(self, workers: int | None = None, time_limit: float = 1.0, go_playouts: int | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.go_playouts = go_playouts
+        self.pool: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def __enter__(self) -> ParallelSearch:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def collect(self, futures: list, deadline: float) -> list:
+        done, late = wait(futures, timeout=remaining(deadline) + GRACE)
+        for future in late:
+            future.cancel()
+        if late:
+            logger.warning(f"Parallel search: {len(late)} of {len(futures)} workers missed the deadline")
+        return [future.result() for future in done if future.exception() is None]
+
+    def search(self, game) -> list[tuple[tuple[int, int] | None, float, int]]:
+        # Merged (move, score, count) results, best first. For Go the score is the win rate and the count is the
+        # number of playouts through the move; for Othello they are the search score of each worker's best move and
+        # the depth the workers were compared at, 0 if every score is exact.
+        self.start()
+        deadline = time.time() + self.time_limit
+        start = time.perf_counter()
+        if game.name == "Go Game":
+            memento = game.create_memento()
+            futures = [
+                self.pool.submit(go_worker, type(game), game.size, memento, deadline, self.go_playouts, random.getrandbits(32))
+                for _ in range(self.workers)
+            ]
+            visits: dict[tuple[int, int] | None, int] = {}
+            wins: dict[tuple[int, int] | None, float] = {}
+            for results in self.collect(futures, deadline):
+                for move, count, winrate in results:
+                    visits[move] = visits.get(move, 0) + count
+                    wins[move] = wins.get(move, 0.0) + winrate * count
+            merged = [(move, wins[move] / visits[move] if visits[move] else 0.0, visits[move]) for move in visits]
+            merged.sort(key=lambda result: -result[2])
+            logger.info(f"Parallel Go search: {sum(visits.values())} playouts on {self.workers} workers in {time.perf_counter() - start:.2f}s")
+            return merged
+        if game.name == "Othello Game":
+            own, opp = game.own_and_opp()
+            moves = sorted(bitboard.squares(bitboard.legal_moves(own, opp)), key=lambda sq: -SQUARE_WEIGHTS[sq >> 3][sq & 7])
+            if not moves:
+                return []
+            # Deal the moves round-robin so every worker gets a mix of strong and weak candidates
+            shares = [0] * min(self.workers, len(moves))
+            for i, sq in enumerate(moves):
+                shares[i % len(shares)] |= 1 << sq
+            futures = [self.pool.submit(othello_worker, own, opp, share, deadline) for share in shares]
+            results = self.collect(futures, deadline)
+            best, depth = merge_depths(results)
+            merged = [(bitboard.coord(sq), score, depth) for score, sq in best]
+            merged.sort(key=lambda result: -result[1])
+            if not merged:
+                merged = [(bitboard.coord(moves[0]), 0, 0)]  # nothing came back in time, any legal move beats none
+            nodes = sum(result[2] for result in results)
+            logger.info(f"Parallel Othello search: {len(results)} of {len(shares)} shares at depth {depth}, {nodes} nodes in {time.perf_counter() - start:.2f}s")
+            return merged
+        raise ValueError(f"No parallel search for {game.name}")
+
+    def best_move(self, game) -> tuple[int, int] | None:
+        for move, _, _ in self.search(game):
+            if move is None or game.is_legal(move):
+                return move
+        return None
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+# Shape of the best line through a point in one direction, assuming the point holds the player's stone
+NONE = 0
+ONE = 1
+TWO = 2
+THREE = 3  # one more stone makes a four
+OPEN_THREE = 4  # one more stone makes an open four
+FOUR = 5  # one more stone makes five
+OPEN_FOUR = 6  # two different points make five
+FIVE = 7
+
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+# A window is the 9 cells centred on the point, 4 on each side; lines are padded by 4 border bits on both ends
+HALF = 4
+WINDOW = 2 * HALF + 1
+WINDOW_MASK = (1 << WINDOW) - 1
+CENTER = 1 << HALF
+FIVE_MASKS = [0b11111 << start for start in range(HALF + 1)]
+
+
+def _has_five(own: int) -> bool:
+    return any(own & mask == mask for mask in FIVE_MASKS)
+
+
+def _run(own: int) -> int:
+    run = 1
+    for step in (1, -1):
+        bit = HALF + step
+        while 0 <= bit < WINDOW and own >> bit & 1:
+            run += 1
+            bit += step
+    return run
+
+
+def _classify(own: int, blocked: int, memo: dict[tuple[int, int], int]) -> int:
+    if (own, blocked) in memo:
+        return memo[(own, blocked)]
+    if _has_five(own):
+        shape = FIVE
+    else:
+        empty = [1 << bit for bit in range(WINDOW) if not (own | blocked) >> bit & 1]
+        fives = sum(1 for cell in empty if _has_five(own | cell))
+        if fives >= 2:
+            shape = OPEN_FOUR
+        elif fives == 1:
+            shape = FOUR
+        else:
+            # Only the four-step needs the recursion, which stays inside the window
+            next_shapes = [_classify(own | cell, blocked, memo) for cell in empty]
+            if OPEN_FOUR in next_shapes:
+                shape = OPEN_THREE
+            elif FOUR in next_shapes:
+                shape = THREE
+            else:
+                best = max((bin(own & mask).count("1") for mask in FIVE_MASKS if not blocked & mask), default=0)
+                shape = TWO if best >= 2 else ONE if best == 1 else NONE
+    memo[(own, blocked)] = shape
+    return shape
+
+
+def _build_table() -> list[int]:
+    # Indexed by own | blocked << WINDOW, entries are shape << 4 | contiguous run through the centre
+    table = [0] * (1 << 2 * WINDOW)
+    memo: dict[tuple[int, int], int] = {}
+    others = [bit for bit in range(WINDOW) if bit != HALF]
+    for code in range(3 ** len(others)):
+        own = CENTER
+        blocked = 0
+        for bit in others:
+            code, cell = divmod(code, 3)
+            if cell == 1:
+                own |= 1 << bit
+            elif cell == 2:
+                blocked |= 1 << bit
+        table[own | blocked << WINDOW] = _classify(own, blocked, memo) << 4 | _run(own)
+    return table
+
+
+TABLE = _build_table()
+
+
+class LineIndex:
+    # Every row, column and diagonal of a Gomoku board as one bitmask per color, updated per move
+
+    def __init__(self, size: int, colors: tuple):
+        self.size = size
+        self.own = {colors[0]: [], colors[1]: []}
+        self.opponent = {colors[0]: colors[1], colors[1]: colors[0]}
+        self.border = []
+        full = (1 << size + 2 * HALF) - 1
+        for dx, dy in DIRECTIONS:
+            lines = size if dx == 0 or dy == 0 else 2 * size - 1
+            for color in colors:
+                self.own[color].append([0] * lines)
+            borders = []
+            for line in range(lines):
+                first, last = (0, size - 1) if dx == 0 or dy == 0 else (max(0, line - size + 1), min(size - 1, line))
+                borders.append(full & ~(((1 << last - first + 1) - 1) << first + HALF))
+            self.border.append(borders)
+
+    def locate(self, coord: tuple[int, int], direction: int) -> tuple[int, int]:
+        # (line, position along the line) of coord in the given direction
+        x, y = coord
+        if direction == 0:
+            return y, x
+        if direction == 1:
+            return x, y
+        if direction == 2:
+            return x - y + self.size - 1, x
+        return x + y, x
+
+    def place(self, coord: tuple[int, int], color):
+        for direction in range(4):
+            line, pos = self.locate(coord, direction)
+            self.own[color][direction][line] |= 1 << pos + HALF
+
+    def remove(self, coord: tuple[int, int], color):
+        for direction in range(4):
+            line, pos = self.locate(coord, direction)
+            self.own[color][direction][line] &= ~(1 << pos + HALF)
+
+    def entry(self, coord: tuple[int, int], color, direction: int) -> int:
+        line, pos = self.locate(coord, direction)
+        own = self.own[color][direction][line] >> pos & WINDOW_MASK | CENTER
+        blocked = (self.own[self.opponent[color]][direction][line] | self.border[direction][line]) >> pos & WINDOW_MASK & ~CENTER
+        return TABLE[own | blocked << WINDOW]
+
+    def entries(self, coord: tuple[int, int], color) -> list[int]:
+        # entry() for all four directions with the color lookups done once; this is the evaluation hot path
+        own = self.own[color]
+        opp = self.own[self.opponent[color]]
+        border = self.border
+        x, y = coord
+        result = []
+        for direction, line, pos in ((0, y, x), (1, x, y), (2, x - y + self.size - 1, x), (3, x + y, x)):
+            own_window = own[direction][line] >> pos & WINDOW_MASK | CENTER
+            blocked = (opp[direction][line] | border[direction][line]) >> pos & WINDOW_MASK & ~CENTER
+            result.append(TABLE[own_window | blocked << WINDOW])
+        return result
+
+    def shape(self, coord: tuple[int, int], color, direction: int) -> int:
+        return self.entry(coord, color, direction) >> 4
+
+    def shapes(self, coord: tuple[int, int], color) -> list[int]:
+        return [entry >> 4 for entry in self.entries(coord, color)]
+
+    def best_shape(self, coord: tuple[int, int], color) -> int:
+        return max(self.entries(coord, color)) >> 4
+
+    def run(self, coord: tuple[int, int], color) -> int:
+        # Longest contiguous line of color through coord, counting coord itself
+        return max(entry & 15 for entry in self.entries(coord, color))
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from functools import lru_cache
+
+import pygame
+
+from board import Color
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+BACKGROUND = (175, 135, 0)
+TEXT_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=None)
+def font(size: int) -> pygame.font.Font:
+    # SysFont looks the font up on disk; one per size is enough for the whole program
+    return pygame.font.SysFont(None, size)
+
+
+_texts: OrderedDict[tuple[str, int, tuple[int, int, int]], pygame.Surface] = OrderedDict()
+
+
+def text(string: str, size: int, color: tuple[int, int, int]) -> pygame.Surface:
+    # Rendered text, kept for the most recently used strings; counters and scores change, labels mostly do not
+    key = (string, size, color)
+    surface = _texts.get(key)
+    if surface is None:
+        surface = font(size).render(string, True, color)
+        _texts[key] = surface
+        if len(_texts) > TEXT_CACHE_SIZE:
+            _texts.popitem(last=False)
+    else:
+        _texts.move_to_end(key)
+    return surface
+
+
+class BoardRenderer:
+    # Retained-mode drawing of the board and sidebar. Everything static (board colour, grid points, buttons) is
+    # drawn once into a background surface. Each frame only the points whose stone changed and the sidebar fields
+    # whose text changed are repainted from that background, and their rects are returned for display.update().
+    def __init__(self, screen: pygame.Surface, grid_size: int, board_size: int, stone_radius: int, buttons: list):
+        self.screen = screen
+        self.grid_size = grid_size
+        self.board_size = board_size
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill(BACKGROUND)
+        for row in range(board_size):
+            for col in range(board_size):
+                pygame.draw.rect(self.background, BLACK, (grid_size + col * grid_size - 1, grid_size + row * grid_size - 1, 2, 2))
+        for button in buttons:
+            button.draw(self.background)
+        self.stones = {Color.BLACK: self.stone_sprite(BLACK, stone_radius), Color.WHITE: self.stone_sprite(WHITE, stone_radius)}
+        self.shown: list[list[Color]] | None = None  # the board as last drawn; None forces a full redraw
+        self.fields: dict[tuple[int, int], tuple[str, int, tuple[int, int, int]]] = {}  # position -> text drawn there
+        self.overlay: list[pygame.Surface] | None = None
+
+    def stone_sprite(self, color: tuple[int, int, int], radius: int) -> pygame.Surface:
+        sprite = pygame.Surface((self.grid_size, self.grid_size), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (self.grid_size // 2, self.grid_size // 2), radius)
+        return sprite
+
+    def invalidate(self):
+        self.shown = None
+
+    def cell_rect(self, row: int, col: int) -> pygame.Rect:
+        half = self.grid_size // 2
+        return pygame.Rect(self.grid_size + col * self.grid_size - half, self.grid_size + row * self.grid_size - half, self.grid_size, self.grid_size)
+
+    def draw_cell(self, row: int, col: int, color: Color) -> pygame.Rect:
+        rect = self.cell_rect(row, col)
+        self.screen.blit(self.background, rect, rect)
+        if color in self.stones:
+            self.screen.blit(self.stones[color], rect)
+        return rect
+
+    def field_rect(self, position: tuple[int, int], size: int) -> pygame.Rect:
+        # A sidebar field runs from its position to the right edge of the window, one text line high
+        return pygame.Rect(position[0], position[1], self.screen.get_width() - position[0], font(size).get_linesize())
+
+    def draw_field(self, position: tuple[int, int], field: tuple[str, int, tuple[int, int, int]] | None) -> pygame.Rect:
+        string, size, color = field if field is not None else self.fields[position]
+        rect = self.field_rect(position, size)
+        self.screen.blit(self.background, rect, rect)
+        if field is not None:
+            self.screen.blit(text(string, size, color), position)
+        return rect
+
+    def overlay_rect(self, lines: list[pygame.Surface]) -> pygame.Rect:
+        line_height = max(line.get_height() for line in lines) + 4
+        return pygame.Rect(self.grid_size // 2, self.grid_size // 2, self.grid_size * self.board_size, line_height * len(lines) + 20)
+
+    def draw_overlay(self, lines: list[pygame.Surface]) -> pygame.Rect:
+        # A panel of text lines over the board, such as the leaderboard
+        rect = self.overlay_rect(lines)
+        pygame.draw.rect(self.screen, BLACK, rect)
+        line_height = max(line.get_height() for line in lines) + 4
+        for i, line in enumerate(lines):
+            self.screen.blit(line, (rect.x + 10, rect.y + 10 + i * line_height))
+        return rect
+
+    def draw(self, board: list[list[Color]], fields: dict[tuple[int, int], tuple[str, int, tuple[int, int, int]]], overlay=None) -> list[pygame.Rect]:
+        # Brings the screen up to date with board, the sidebar fields (position -> (text, font size, colour)) and
+        # an optional overlay; returns the rects that changed, the whole screen after invalidate()
+        if self.shown is None or overlay is not self.overlay and self.overlay is not None:
+            # First frame, forced redraw, or an overlay was closed or replaced: paint everything
+            self.screen.blit(self.background, (0, 0))
+            for row in range(self.board_size):
+                for col in range(self.board_size):
+                    if board[row][col] in self.stones:
+                        self.screen.blit(self.stones[board[row][col]], self.cell_rect(row, col))
+            for position, (string, size, color) in fields.items():
+                self.screen.blit(text(string, size, color), position)
+            if overlay is not None:
+                self.draw_overlay(overlay)
+            self.shown = [list(row) for row in board]
+            self.fields = dict(fields)
+            self.overlay = overlay
+            return [self.screen.get_rect()]
+        dirty = []
+        for row in range(self.board_size):
+            shown_row = self.shown[row]
+            board_row = board[row]
+            if shown_row == board_row:
+                continue
+            for col in range(self.board_size):
+                if shown_row[col] != board_row[col]:
+                    dirty.append(self.draw_cell(row, col, board_row[col]))
+                    shown_row[col] = board_row[col]
+        for position in self.fields.keys() | fields.keys():
+            field = fields.get(position)
+            if field != self.fields.get(position):
+                dirty.append(self.draw_field(position, field))
+        self.fields = dict(fields)
+        if overlay is not None and (dirty or overlay is not self.overlay):
+            dirty.append(self.draw_overlay(overlay))
+        self.overlay = overlay
+        return dirty
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import copy
+
+from loguru import logger
+
+from board import BaseBoardGame, GoGame, Memento, MoveDelta
+
+KEYFRAME_INTERVAL = 16
+SPEEDS = [0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0]  # moves per second
+
+
+class ReplayCursor:
+    # A private copy of a game that can be moved to any ply of its replay. Every interval plies a memento is kept as
+    # a keyframe, and every move keeps the MoveDelta it produced: a step back is one undo, a step forward one apply,
+    # and a seek restores the nearest keyframe and applies at most interval moves.
+    def __init__(self, game: BaseBoardGame, interval: int = KEYFRAME_INTERVAL):
+        self.interval = interval
+        self.moves = list(game.replay)
+        self.game = type(game)(game.size, None, None)
+        if isinstance(game, GoGame):
+            self.game.komi = game.komi
+        self.keyframes: list[Memento] = []
+        self.deltas: list[MoveDelta] = []
+        for ply, move in enumerate(self.moves):
+            if ply % interval == 0:
+                self.keyframes.append(self.game.create_memento())
+            delta = self.game.apply(move)
+            if delta is None:
+                logger.warning(f"Replay stops at ply {ply}: {move} is not a legal move there.")
+                self.moves = self.moves[:ply]
+                break
+            self.deltas.append(delta)
+        # apply() scores a Go game that ends by passes with every stone alive; the last ply shows the source game's
+        # result instead, which had its dead stones taken off
+        self.final_state = None
+        if isinstance(game, GoGame) and game.game_over and self.game.game_over and len(self.moves) == len(game.replay):
+            self.final_state = {"winner": game.winner, "final_score": game.final_score, "dead_stones": set(game.dead_stones)}
+            self.show_final_result()
+        if len(self.moves) % interval == 0:
+            self.keyframes.append(self.game.create_memento())
+        self.ply = len(self.moves)
+        # Playback state, advanced by tick() from the frame loop
+        self.playing = False
+        self.speed = 2.0
+        self.elapsed = 0.0
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def step_forward(self) -> bool:
+        if self.ply == len(self.moves):
+            return False
+        self.deltas[self.ply] = self.game.apply(self.moves[self.ply])
+        self.ply += 1
+        if self.ply == len(self.moves):
+            self.show_final_result()
+        return True
+
+    def show_final_result(self):
+        if self.final_state is not None:
+            self.game.winner = self.final_state["winner"]
+            self.game.final_score = self.final_state["final_score"]
+            self.game.dead_stones = set(self.final_state["dead_stones"])
+
+    def step_back(self) -> bool:
+        if self.ply == 0:
+            return False
+        self.ply -= 1
+        self.game.undo(self.deltas[self.ply])
+        return True
+
+    def seek(self, ply: int):
+        ply = max(0, min(ply, len(self.moves)))
+        if ply < self.ply <= ply + self.interval:
+            while self.ply > ply:
+                self.step_back()
+            return
+        if not self.ply <= ply <= self.ply + self.interval:
+            # restore_from_memento keeps the board and sets it is given, so the keyframe itself must stay untouched
+            self.game.restore_from_memento(copy.deepcopy(self.keyframes[ply // self.interval]))
+            self.ply = ply // self.interval * self.interval
+        while self.ply < ply:
+            self.step_forward()
+
+    def play(self):
+        if self.ply == len(self.moves):
+            self.seek(0)
+        self.playing = True
+        self.elapsed = 0.0
+
+    def pause(self):
+        self.playing = False
+
+    def change_speed(self, steps: int):
+        # Moves to the next faster (steps > 0) or slower (steps < 0) entry of SPEEDS
+        index = min(range(len(SPEEDS)), key=lambda i: abs(SPEEDS[i] - self.speed))
+        self.speed = SPEEDS[max(0, min(index + steps, len(SPEEDS) - 1))]
+
+    def tick(self, time_delta: float) -> bool:
+        # Advances playback by the seconds since the last frame; returns whether the position changed
+        if not self.playing:
+            return False
+        self.elapsed += time_delta
+        moves = int(self.elapsed * self.speed)
+        if moves == 0:
+            return False
+        self.elapsed -= moves / self.speed
+        self.seek(self.ply + moves)
+        if self.ply == len(self.moves):
+            self.playing = False
+        return True
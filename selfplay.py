@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from loguru import logger
+
+from archive import GameArchive
+from board import (
+    BaseBoardGame,
+    Color,
+    GoGame,
+    GomokuGame,
+    Level1AIPlayerStrategy,
+    Level2AIPlayerStrategy,
+    Level3AIPlayerStrategy,
+    OthelloGame,
+    PlayerStrategy,
+)
+
+GAMES = {"go": GoGame, "gomoku": GomokuGame, "othello": OthelloGame}
+STRATEGIES = {"level1": Level1AIPlayerStrategy, "level2": Level2AIPlayerStrategy, "level3": Level3AIPlayerStrategy}
+FIELDS = ["index", "game", "black", "white", "size", "seed", "winner", "rounds", "seconds", "moves", "move_times"]
+
+
+def init_worker():
+    # Per-move logging from the games would dominate the run time
+    logger.disable("board")
+
+
+def play_game(
+    game_cls: type[BaseBoardGame],
+    black_cls: type[PlayerStrategy],
+    white_cls: type[PlayerStrategy],
+    size: int,
+    index: int,
+    seed: int,
+    max_rounds: int,
+    max_stalls: int,
+) -> dict:
+    random.seed(seed)
+    game = game_cls(size, black_cls(Color.BLACK), white_cls(Color.WHITE))
+    move_times = []
+    stalls = 0
+    start = time.perf_counter()
+    try:
+        while not game.game_over and game.round < max_rounds and stalls < max_stalls:
+            round_before = game.round
+            move_start = time.perf_counter()
+            game.play_round()
+            if game.round == round_before:
+                # The strategy picked a move the game rejected; let it try again
+                stalls += 1
+                continue
+            move_times.append(time.perf_counter() - move_start)
+    finally:
+        game.player1_strategy.close()
+        game.player2_strategy.close()
+    return {
+        "index": index,
+        "game": game.name,
+        "black": black_cls.role,
+        "white": white_cls.role,
+        "size": game.size,
+        "seed": seed,
+        "winner": game.winner if game.game_over else "Unfinished",
+        "rounds": game.round,
+        "seconds": time.perf_counter() - start,
+        "moves": list(game.replay),
+        "move_times": move_times,
+        "record": game.to_record(black_cls.role, white_cls.role),
+    }
+
+
+def play_game_args(args: tuple) -> dict:
+    return play_game(*args)
+
+
+def run(
+    game_cls: type[BaseBoardGame],
+    black_cls: type[PlayerStrategy],
+    white_cls: type[PlayerStrategy],
+    size: int,
+    games: int,
+    output: str,
+    workers: int | None = None,
+    seed: int = 0,
+    max_rounds: int = 1000,
+    max_stalls: int = 1000,
+) -> int:
+    # Plays the games across a process pool and streams one record per finished game to a .jsonl, .csv or .archive file
+    init_worker()
+    tasks = [(game_cls, black_cls, white_cls, size, index, seed + index, max_rounds, max_stalls) for index in range(games)]
+    if output.endswith(".archive"):
+        archive = GameArchive(output[: -len(".archive")])
+        file = None
+    else:
+        archive = None
+        file = open(output, "w", newline="")
+    finished = 0
+    try:
+        with Pool(workers or os.cpu_count(), initializer=init_worker) as pool:
+            writer = csv.DictWriter(file, fieldnames=FIELDS) if output.endswith(".csv") else None
+            if writer is not None:
+                writer.writeheader()
+            for result in pool.imap_unordered(play_game_args, tasks):
+                record = result.pop("record")
+                if archive is not None:
+                    archive.append(record)
+                elif writer is not None:
+                    writer.writerow({**result, "moves": json.dumps(result["moves"]), "move_times": json.dumps(result["move_times"])})
+                    file.flush()
+                else:
+                    file.write(json.dumps(result) + "\n")
+                    file.flush()
+                finished += 1
+                if finished % 100 == 0:
+                    logger.info(f"{finished}/{games} games finished")
+    finally:
+        if archive is not None:
+            archive.close()
+        else:
+            file.close()
+    return finished
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play AI-vs-AI games without the GUI")
+    parser.add_argument("game", choices=GAMES)
+    parser.add_argument("black", choices=STRATEGIES)
+    parser.add_argument("white", choices=STRATEGIES)
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--output", default="selfplay.jsonl")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = run(
+        GAMES[args.game],
+        STRATEGIES[args.black],
+        STRATEGIES[args.white],
+        args.size,
+        args.games,
+        args.output,
+        workers=args.workers,
+        seed=args.seed,
+        max_rounds=args.max_rounds,
+    )
+    logger.info(f"{count} games written to {args.output} in {time.perf_counter() - start:.1f}s")